@@ -40,6 +40,40 @@ OTP_EXPIRE_MINUTES = 2
 OTP_RESEND_COOLDOWN_SECONDS = 120
 OTP_MAX_RESENDS_PER_HOUR = 5
 
+# 'accounts.otp_store.CacheOtpStore' keeps codes in the cache with a TTL; it
+# needs a cache shared by all web processes. The database store is durable.
+OTP_STORE = os.getenv("OTP_STORE", "accounts.otp_store.DatabaseOtpStore")
+
+# OTP texts go through the SMS outbox; `manage.py send_sms_outbox` delivers them.
+# Use 'utils.sms.FakeBackend' to run and load-test offline.
+SMS_BACKEND = os.getenv("SMS_BACKEND", "utils.sms.KavenegarBackend")
+SMS_SENDER = '2000660110'
+SMS_RETRY_BACKOFF_SECONDS = 5
+SMS_RETRY_BACKOFF_MAX_SECONDS = 600
+
+PRODUCTS_PAGE_SIZE = 24
+
+# How checkout takes stock: "locking" (select_for_update first) or
+# "conditional" (UPDATE ... WHERE stock >= n, no row locks, retried on lock
+# errors). Benchmark with bench_stock_contention before switching.
+CHECKOUT_STOCK_STRATEGY = os.getenv("CHECKOUT_STOCK_STRATEGY", "locking")
+CHECKOUT_RETRY_ATTEMPTS = 3
+CHECKOUT_RETRY_BACKOFF_SECONDS = 0.05
+
+# Where guests' carts live. Signed-in users always keep theirs in the session.
+# 'cart.storage.SignedCookieCartStorage' and 'cart.storage.CacheCartStorage'
+# keep browsing guests from writing session rows; the latter needs the
+# shared cache (CACHES below).
+CART_GUEST_STORAGE = os.getenv("CART_GUEST_STORAGE", "cart.storage.SignedCookieCartStorage")
+CART_COOKIE_AGE = 60 * 60 * 24 * 30
+# Minutes a cart line keeps its units set aside (cart.holds); run
+# `release_expired_holds --loop` to give expired ones back.
+CART_HOLD_MINUTES = 15
+PRODUCT_DETAIL_CACHE_TIMEOUT = 60 * 60
+# Seconds a cached availability count (products.availability) lives; it
+# bounds drift between `reconcile_availability` runs.
+AVAILABILITY_CACHE_TIMEOUT = 60 * 15
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -60,23 +94,28 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.RequestProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cart.middleware.CartStorageMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# EmailOrUsernameBackend extends ModelBackend (permissions, inactive users)
+# and already covers usernames; a second backend would look the user up and
+# hash the password again on every failed login.
 AUTHENTICATION_BACKENDS = [
     'accounts.backends.EmailOrUsernameBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to RequestProfileMiddleware.
+        'BACKEND': 'core.instrumentation.ProfiledDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -92,6 +131,49 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'OliveGarden.wsgi.application'
 
+# Per-request SQL/template profiling (core.instrumentation). On with DEBUG;
+# set REQUEST_PROFILING=1 to profile a production deployment.
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "1" if DEBUG else "0") == "1"
+REQUEST_PROFILE_SLOWEST = 3
+QUERY_COUNT_WARNING = int(os.getenv("QUERY_COUNT_WARNING", "50"))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One JSON line per request; INFO logs every request, WARNING only
+        # the ones over QUERY_COUNT_WARNING.
+        'core.requests': {
+            'handlers': ['console'],
+            'level': os.getenv("REQUEST_LOG_LEVEL", "WARNING"),
+            'propagate': False,
+        },
+        # Structured events from core.events, written by its background
+        # thread; the ring buffer keeps them whatever the level.
+        'core.events': {
+            'handlers': ['console'],
+            'level': os.getenv("EVENT_LOG_LEVEL", "WARNING"),
+            'propagate': False,
+        },
+    },
+}
+
+# core.events: bounded hand-off queue (full = event dropped), the ring
+# buffer staff read at /debug/events/, the share of each event kept
+# (0.0-1.0) and per-event caps in events per second.
+EVENT_QUEUE_SIZE = 10_000
+EVENT_BUFFER_SIZE = 500
+EVENT_SAMPLING = {
+    'cart.detail_viewed': 0.1,
+}
+EVENT_RATE_LIMITS = {
+    'cart.add': 50,
+    'cart.update': 50,
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -99,11 +181,76 @@ WSGI_APPLICATION = 'OliveGarden.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv("DB_PATH", BASE_DIR / 'db.sqlite3'),
+        # Reuse connections across requests instead of reconnecting each time.
+        'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds to wait on a locked database before raising.
+            'timeout': int(os.getenv("DB_BUSY_TIMEOUT", "20")),
+            # Take the write lock at BEGIN so concurrent checkouts queue up
+            # instead of failing when upgrading a read lock.
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Optional read-only copy for catalog reads (see core.db.PrimaryReplicaRouter).
+# Locally, point this at a second SQLite file and refresh it with
+# `python manage.py sync_replica`.
+if os.getenv("DB_REPLICA_PATH"):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv("DB_REPLICA_PATH"),
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['core.db.PrimaryReplicaRouter']
+
+# Applied to every new SQLite connection by core.db.tune_sqlite_connection.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv("DB_BUSY_TIMEOUT", "20")) * 1000,
+    'mmap_size': int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024))),
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
 }
 
 
+# products.availability, the OTP resend counter, CacheOtpStore and
+# CacheCartStorage need a cache that every web process and management
+# command sees, with atomic incr/decr: Redis (REDIS_URL, needs the `redis`
+# package) or Memcached (MEMCACHED_LOCATION, `pymemcache`). Without either
+# the cache is per process, which only a single runserver can live with;
+# core.checks refuses it once DEBUG is off.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+        }
+    }
+elif os.getenv("MEMCACHED_LOCATION"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': os.getenv("MEMCACHED_LOCATION"),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            # Room for a count and a fragment per product without culling.
+            'OPTIONS': {'MAX_ENTRIES': 1_000_000},
+        }
+    }
+
+# Runs the suite against a private cache (see core.testing).
+TEST_RUNNER = 'core.testing.PrivateCacheTestRunner'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -151,8 +298,35 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# collectstatic writes content-hashed names plus .gz (and .br, with the
+# `brotli` package) variants; see core.staticfiles.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "core.staticfiles.CompressedManifestStaticFilesStorage"},
+}
+STATIC_COMPRESS_WORKERS = 4
+# Serve STATIC_ROOT from Django (pre-compressed, immutable caching) when no
+# front server does it.
+SERVE_STATIC = os.getenv("SERVE_STATIC", "0") == "1"
+
 # URL to access the media files in the browser
 MEDIA_URL = '/media/'
 
 # Absolute path to the folder where user-uploaded files will be stored
 MEDIA_ROOT = BASE_DIR / 'media' 
+
+# core.media.serve checks access, then leaves the bytes to the front server:
+# "x-accel-redirect" (nginx internal location at MEDIA_ACCEL_REDIRECT_PREFIX)
+# or "x-sendfile". Empty: Django streams the file itself.
+MEDIA_SERVE_MODE = os.getenv("MEDIA_SERVE_MODE", "")
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+# Paths anyone may fetch; everything else under MEDIA_ROOT is staff-only.
+MEDIA_PUBLIC_PREFIXES = ("Products_Images/",)
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
+
+# Responsive WebP/JPEG derivatives are built on a process pool after uploads
+IMAGE_DERIVATIVE_WORKERS = 2
+IMAGE_DERIVATIVES_ASYNC = True
+# Seconds the list of an image's existing derivatives stays cached; it is
+# dropped whenever they are rebuilt.
+IMAGE_DERIVATIVES_CACHE_TIMEOUT = 60 * 60 * 24
@@ -6,6 +6,8 @@ from django.contrib.auth.admin import GroupAdmin as DjangoGroupAdmin
 from django.contrib.admin.sites import NotRegistered
 from django.utils.translation import gettext_lazy as _
 
+from .models import SmsMessage
+
 User = get_user_model()
 
 try:
@@ -100,3 +102,21 @@ class UserAdmin(DjangoUserAdmin):
             ]
         
         return readonly
+
+
+@admin.register(SmsMessage)
+class SmsMessageAdmin(admin.ModelAdmin):
+    list_display = ("id", "receptor", "status", "attempts", "next_attempt_at", "sent_at")
+    
+    list_filter = ("status",)
+    
+    search_fields = ("receptor",)
+    
+    ordering = ("-created_at",)
+    
+    # The text is the OTP itself; staff handling the outbox never see it.
+    exclude = ("message",)
+    
+    readonly_fields = ("created_at", "sent_at", "claimed_by", "claimed_at", "last_error")
+    
+    list_per_page = 50
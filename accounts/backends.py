@@ -1,23 +1,49 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
 from django.db.models import Q
+from django.db.models.functions import Lower
 
 UserModel = get_user_model()
 
 class EmailOrUsernameBackend(ModelBackend):
     def authenticate(self, request, username = None, password = None, **kwargs):
-        try:
-            user = UserModel.objects.get(Q(username__iexact=username) | Q(email__iexact=username))
-        except:
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        
+        login_id = username.strip().lower()
+        
+        # Compare against Lower(...) so SQLite can use the functional
+        # indexes; __iexact compiles to LIKE and scans the whole table.
+        candidates = list(
+            UserModel.objects.alias(
+                username_lower=Lower("username"),
+                email_lower=Lower("email"),
+            ).filter(
+                Q(username_lower=login_id) | Q(email_lower=login_id)
+            )[:2]
+        )
+        
+        if len(candidates) > 1:
+            # An email that equals someone else's username: the username wins.
+            candidates = [u for u in candidates if u.username.lower() == login_id] or candidates[:1]
+        
+        if not candidates:
+            # Hash anyway so a missing account takes as long as a wrong password.
+            UserModel().set_password(password)
             return None
         
-        if user.check_password(password):
+        user = candidates[0]
+        # Inactive accounts (sign-ups still waiting for their OTP) stay out.
+        if user.check_password(password) and self.user_can_authenticate(user):
             return user
         
         return None
 
     def get_user(self, user_id):
         try:
-            return UserModel.objects.get(pk=user_id)
+            user = UserModel.objects.get(pk=user_id)
         except UserModel.DoesNotExist:
             return None
+        return user if self.user_can_authenticate(user) else None
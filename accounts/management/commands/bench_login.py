@@ -0,0 +1,98 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from accounts.models import User
+
+BENCH_PREFIX = "benchuser"
+BENCH_PASSWORD = "Bench!Pass1"
+
+
+class Command(BaseCommand):
+    help = "Measure sign-in throughput of EmailOrUsernameBackend on a large user table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000,
+                            help="Seed bench users up to this many before measuring.")
+        parser.add_argument("--attempts", type=int, default=2000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--real-hasher", action="store_true",
+                            help="Keep the production password hasher. By default a fast "
+                                 "hasher is used so the numbers show lookup cost, not PBKDF2.")
+
+    def _seed(self, target: int, batch_size: int) -> None:
+        existing = User.objects.filter(username__startswith=BENCH_PREFIX).count()
+        if existing >= target:
+            return
+
+        self.stdout.write(f"Seeding {target - existing} users...")
+        # One hash shared by every row; hashing a million passwords is not what we measure.
+        password = make_password(BENCH_PASSWORD)
+        started = time.perf_counter()
+        for start in range(existing, target, batch_size):
+            stop = min(start + batch_size, target)
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(
+                        username=f"{BENCH_PREFIX}{i}",
+                        email=f"{BENCH_PREFIX}{i}@example.com",
+                        password=password,
+                    )
+                    for i in range(start, stop)
+                ], batch_size=batch_size)
+        self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s.")
+
+    def handle(self, *args, **options):
+        target = options["users"]
+        attempts = options["attempts"]
+        self._seed(target, options["batch_size"])
+
+        hashers = None if options["real_hasher"] else [
+            "django.contrib.auth.hashers.MD5PasswordHasher",
+            "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        ]
+        rng = random.Random(7)
+
+        def login_ids():
+            for i in range(attempts):
+                n = rng.randrange(target)
+                kind = i % 3
+                if kind == 0:
+                    yield f"{BENCH_PREFIX}{n}".upper(), BENCH_PASSWORD
+                elif kind == 1:
+                    yield f"{BENCH_PREFIX}{n}@Example.com", BENCH_PASSWORD
+                else:
+                    yield f"nobody{n}@example.com", "wrong"
+
+        with override_settings(**({"PASSWORD_HASHERS": hashers} if hashers else {})):
+            # Store the bench password with whichever hasher this run uses.
+            User.objects.filter(username__startswith=BENCH_PREFIX).update(
+                password=make_password(BENCH_PASSWORD)
+            )
+
+            samples = []
+            queries = 0
+            ok = 0
+            started = time.perf_counter()
+            for login_id, password in login_ids():
+                with CaptureQueriesContext(connection) as captured:
+                    t0 = time.perf_counter()
+                    user = authenticate(None, username=login_id, password=password)
+                    samples.append((time.perf_counter() - t0) * 1000)
+                queries += len(captured)
+                ok += user is not None
+            elapsed = time.perf_counter() - started
+
+        samples.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f"{attempts} attempts over {User.objects.count()} users: "
+            f"{attempts / elapsed:,.0f} logins/s, p50 {statistics.median(samples):.2f}ms, "
+            f"p99 {samples[int(len(samples) * 0.99) - 1]:.2f}ms, "
+            f"{queries / attempts:.2f} queries/attempt, {ok} succeeded."
+        ))
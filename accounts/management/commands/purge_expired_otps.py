@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import OtpCode, SmsMessage
+from accounts.otp_store import otp_lifetime
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired OTP codes from the database store, and sent or failed "
+        "SMS outbox rows past the OTP lifetime, in small batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--sleep", type=float, default=0.0,
+                            help="Seconds to pause between batches to keep lock time short.")
+
+    def handle(self, *args, **options):
+        batch_size: int = options["batch_size"]
+        pause: float = options["sleep"]
+
+        cutoff = timezone.now() - otp_lifetime()
+        codes = self._delete_in_batches(
+            OtpCode.objects.filter(created_at__lt=cutoff), batch_size, pause
+        )
+        messages = self._delete_in_batches(
+            SmsMessage.objects.filter(
+                status__in=[SmsMessage.Status.SENT, SmsMessage.Status.FAILED],
+                created_at__lt=cutoff,
+            ),
+            batch_size,
+            pause,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {codes} expired OTP codes and {messages} finished SMS messages."
+        ))
+
+    def _delete_in_batches(self, queryset, batch_size: int, pause: float) -> int:
+        deleted = 0
+        while True:
+            ids = list(queryset.order_by("created_at").values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return deleted
+
+            count, _ = queryset.model.objects.filter(pk__in=ids).delete()
+            deleted += count
+            if pause:
+                time.sleep(pause)
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.outbox import drain_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver queued SMS messages (OTP codes) in batches, with retries and backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=4,
+                            help="Maximum provider requests in flight.")
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep polling instead of exiting once the outbox is empty.")
+        parser.add_argument("--interval", type=float, default=1.0,
+                            help="Seconds to sleep between polls when idle (with --loop).")
+
+    def handle(self, *args, **options):
+        batch_size: int = options["batch_size"]
+        concurrency: int = options["concurrency"]
+        max_attempts: int = options["max_attempts"]
+        loop: bool = options["loop"]
+        interval: float = options["interval"]
+
+        totals = {"sent": 0, "retried": 0, "failed": 0}
+        started = time.perf_counter()
+        try:
+            while True:
+                result = drain_batch(batch_size, concurrency, max_attempts)
+                totals["sent"] += result.sent
+                totals["retried"] += result.retried
+                totals["failed"] += result.failed
+
+                if result.sent or result.retried or result.failed:
+                    self.stdout.write(
+                        f"sent={result.sent} retried={result.retried} failed={result.failed}"
+                    )
+                    continue
+
+                if not loop:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {totals['sent']}, scheduled {totals['retried']} retries, "
+            f"gave up on {totals['failed']} in {elapsed:.2f}s."
+        ))
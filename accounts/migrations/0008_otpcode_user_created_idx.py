@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0007_user_lower_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="otpcode",
+            index=models.Index(
+                fields=["user", "-created_at"], name="otp_user_created_idx"
+            ),
+        ),
+    ]
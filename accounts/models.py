@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -21,6 +23,13 @@ class User(AbstractUser):
         related_name='custom_user_permissions',
         blank=True
     )
+    
+    class Meta(AbstractUser.Meta):
+        # Sign-in matches username or email case-insensitively on these.
+        indexes = [
+            models.Index(Lower("username"), name="user_username_lower_idx"),
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+        ]
 
     def __str__(self):
         return self.username
@@ -38,6 +47,50 @@ class OtpCode(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Latest code per user: equality on user, then walk created_at.
+            models.Index(fields=["user", "-created_at"], name="otp_user_created_idx"),
+        ]
+    
     def __str__(self):
         return f"{self.phone_number} - {self.code}"
-    
\ No newline at end of file
+    
+
+class SmsMessage(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENDING = "SENDING", "Sending"
+        SENT = "SENT", "Sent"
+        FAILED = "FAILED", "Failed"
+    
+    receptor = models.CharField(max_length=15)
+    
+    message = models.CharField(max_length=500)
+    
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    
+    attempts = models.PositiveSmallIntegerField(default=0)
+    
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    
+    # Set while a worker holds the row; lets a crashed worker's rows be reclaimed.
+    claimed_by = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    
+    last_error = models.CharField(max_length=255, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="sms_outbox_due_idx"),
+        ]
+    
+    def __str__(self):
+        return f"{self.receptor} ({self.status})"
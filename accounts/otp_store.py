@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import hmac
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OtpCode
+
+
+@dataclass(frozen=True)
+class OtpRecord:
+    code: str
+    created_at: datetime
+
+
+class OtpStatus:
+    VALID = "valid"
+    INVALID = "invalid"
+    EXPIRED = "expired"
+
+
+def otp_lifetime() -> timedelta:
+    return timedelta(minutes=getattr(settings, "OTP_EXPIRE_MINUTES", 2))
+
+
+class BaseOtpStore:
+    def issue(self, user, code: str) -> OtpRecord:
+        raise NotImplementedError
+
+    def latest(self, user) -> OtpRecord | None:
+        raise NotImplementedError
+
+    def discard(self, user) -> None:
+        raise NotImplementedError
+
+    def verify(self, user, code: str) -> str:
+        """Check `code` against the user's current OTP; expired codes are discarded."""
+        record = self.latest(user)
+        if record is None or not hmac.compare_digest(record.code, code):
+            return OtpStatus.INVALID
+
+        if timezone.now() > record.created_at + otp_lifetime():
+            self.discard(user)
+            return OtpStatus.EXPIRED
+
+        return OtpStatus.VALID
+
+
+class DatabaseOtpStore(BaseOtpStore):
+    """Durable store on the OtpCode table; run `purge_expired_otps` to trim it."""
+
+    def issue(self, user, code: str) -> OtpRecord:
+        OtpCode.objects.filter(user=user).delete()
+        otp = OtpCode.objects.create(user=user, code=code)
+        return OtpRecord(code=otp.code, created_at=otp.created_at)
+
+    def latest(self, user) -> OtpRecord | None:
+        row = (
+            OtpCode.objects.filter(user=user)
+            .order_by("-created_at")
+            .values_list("code", "created_at")
+            .first()
+        )
+        return OtpRecord(*row) if row else None
+
+    def discard(self, user) -> None:
+        OtpCode.objects.filter(user=user).delete()
+
+
+class CacheOtpStore(BaseOtpStore):
+    """
+    Codes live in the cache and disappear on their own, so nothing has to be
+    purged. The code has to verify on whichever worker gets the next
+    request, hence the shared default cache (enforced by core.checks).
+    """
+
+    key_prefix = "otp:code:"
+
+    def _key(self, user) -> str:
+        return f"{self.key_prefix}{user.pk}"
+
+    def issue(self, user, code: str) -> OtpRecord:
+        now = timezone.now()
+        # Keep the record for the resend cooldown as well, which reads created_at.
+        cooldown = getattr(settings, "OTP_RESEND_COOLDOWN_SECONDS", 120)
+        ttl = max(int(otp_lifetime().total_seconds()), cooldown)
+        cache.set(self._key(user), (code, now.timestamp()), ttl)
+        return OtpRecord(code=code, created_at=now)
+
+    def latest(self, user) -> OtpRecord | None:
+        value = cache.get(self._key(user))
+        if value is None:
+            return None
+        code, created_ts = value
+        return OtpRecord(code=code, created_at=datetime.fromtimestamp(created_ts, tz=dt_timezone.utc))
+
+    def discard(self, user) -> None:
+        cache.delete(self._key(user))
+
+
+class SlidingWindowCounter:
+    """
+    Approximate sliding-window rate counter on two fixed-window buckets.
+
+    The previous bucket is weighted by how much of it still overlaps the
+    window, which gives an O(1) estimate (two cache reads, one increment)
+    instead of counting rows. The buckets live in the shared default cache;
+    a per-process one would give every worker its own limit.
+    """
+
+    def __init__(self, prefix: str, window_seconds: int):
+        self.prefix = prefix
+        self.window = window_seconds
+
+    def _keys(self, identity, now: float) -> tuple[str, str, float]:
+        bucket = int(now // self.window)
+        elapsed = (now % self.window) / self.window
+        return (
+            f"{self.prefix}:{identity}:{bucket}",
+            f"{self.prefix}:{identity}:{bucket - 1}",
+            elapsed,
+        )
+
+    def count(self, identity) -> float:
+        current_key, previous_key, elapsed = self._keys(identity, time.time())
+        values = cache.get_many([current_key, previous_key])
+        return values.get(current_key, 0) + values.get(previous_key, 0) * (1 - elapsed)
+
+    def hit(self, identity) -> None:
+        current_key, _, _ = self._keys(identity, time.time())
+        # Two windows: the bucket is still read as "previous" during the next one.
+        if not cache.add(current_key, 1, self.window * 2):
+            try:
+                cache.incr(current_key)
+            except ValueError:
+                cache.set(current_key, 1, self.window * 2)
+
+
+def get_otp_store() -> BaseOtpStore:
+    return import_string(getattr(settings, "OTP_STORE", "accounts.otp_store.DatabaseOtpStore"))()
+
+
+otp_send_counter = SlidingWindowCounter("otp:sends", 60 * 60)
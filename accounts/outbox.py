@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from utils.sms import get_backend
+from .models import SmsMessage
+
+
+@dataclass(frozen=True)
+class DrainResult:
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+def enqueue_sms(receptor: str, message: str) -> SmsMessage:
+    """
+    Add a message to the outbox. Call it inside the transaction that creates
+    whatever the message is about, so both commit or neither does.
+    """
+    return SmsMessage.objects.create(receptor=receptor or "", message=message)
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    base = getattr(settings, "SMS_RETRY_BACKOFF_SECONDS", 5)
+    cap = getattr(settings, "SMS_RETRY_BACKOFF_MAX_SECONDS", 600)
+    return timedelta(seconds=min(cap, base * 2 ** max(attempts - 1, 0)))
+
+
+def claim_batch(batch_size: int) -> list[SmsMessage]:
+    """
+    Atomically take up to `batch_size` due messages for this worker.
+    
+    The conditional UPDATE only flips rows that are still unclaimed (or
+    whose lease ran out), so two workers never send the same message.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, "SMS_CLAIM_LEASE_SECONDS", 300))
+    claimable = (
+        Q(status=SmsMessage.Status.PENDING, next_attempt_at__lte=now)
+        | Q(status=SmsMessage.Status.SENDING, claimed_at__lt=now - lease)
+    )
+    
+    candidate_ids = list(
+        SmsMessage.objects.filter(claimable)
+        .order_by("next_attempt_at", "id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if not candidate_ids:
+        return []
+    
+    token = uuid.uuid4().hex
+    SmsMessage.objects.filter(claimable, pk__in=candidate_ids).update(
+        status=SmsMessage.Status.SENDING,
+        claimed_by=token,
+        claimed_at=now,
+    )
+    return list(SmsMessage.objects.filter(claimed_by=token, status=SmsMessage.Status.SENDING))
+
+
+def _deliver(backend, message: SmsMessage) -> str | None:
+    try:
+        backend.send(message.receptor, message.message)
+    except Exception as e:
+        return str(e)[:255] or e.__class__.__name__
+    return None
+
+
+def drain_batch(batch_size: int = 100, concurrency: int = 4, max_attempts: int = 5) -> DrainResult:
+    """Claim one batch and send it with at most `concurrency` requests in flight."""
+    messages = claim_batch(batch_size)
+    if not messages:
+        return DrainResult()
+    
+    backend = get_backend()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        errors = list(pool.map(lambda message: _deliver(backend, message), messages))
+    
+    now = timezone.now()
+    sent_ids = [message.pk for message, error in zip(messages, errors) if error is None]
+    # The body carries the OTP code; nothing needs it once the message is done.
+    SmsMessage.objects.filter(pk__in=sent_ids).update(
+        message="",
+        status=SmsMessage.Status.SENT,
+        attempts=F("attempts") + 1,
+        sent_at=now,
+        claimed_by="",
+        last_error="",
+    )
+    
+    retried = failed = 0
+    for message, error in zip(messages, errors):
+        if error is None:
+            continue
+        
+        message.attempts += 1
+        message.last_error = error
+        message.claimed_by = ""
+        if message.attempts >= max_attempts:
+            message.message = ""
+            message.status = SmsMessage.Status.FAILED
+            failed += 1
+        else:
+            message.status = SmsMessage.Status.PENDING
+            message.next_attempt_at = now + backoff_delay(message.attempts)
+            retried += 1
+        message.save(update_fields=["message", "attempts", "last_error", "claimed_by", "status", "next_attempt_at"])
+    
+    return DrainResult(sent=len(sent_ids), retried=retried, failed=failed)
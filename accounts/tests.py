@@ -1,3 +1,192 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import authenticate, get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import QueryPlanAssertions
+from utils.sms import FakeBackend
+from .models import OtpCode, SmsMessage
+from .outbox import claim_batch, drain_batch, enqueue_sms
+from .otp_store import CacheOtpStore, DatabaseOtpStore, OtpStatus, SlidingWindowCounter, otp_lifetime
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite's")
+class OtpQueryPlanTests(QueryPlanAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="otpuser", password="pw")
+        cls.store = DatabaseOtpStore()
+
+    def test_latest_code(self):
+        self.assertNoFullScan(
+            OtpCode.objects.filter(user=self.user).order_by("-created_at").values_list("code", "created_at")[:1]
+        )
+
+    def test_issue_and_verify(self):
+        with self.assertNoFullScans():
+            self.store.issue(self.user, "123456")
+            self.store.verify(self.user, "123456")
+
+
+class OtpStoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="otpstore", password="pw")
+
+    def test_issue_verify_and_expiry(self):
+        for store in (DatabaseOtpStore(), CacheOtpStore()):
+            with self.subTest(store=type(store).__name__):
+                record = store.issue(self.user, "123456")
+                self.assertEqual(store.latest(self.user).code, "123456")
+                self.assertEqual(store.verify(self.user, "654321"), OtpStatus.INVALID)
+                self.assertEqual(store.verify(self.user, "123456"), OtpStatus.VALID)
+
+                # A new code replaces the previous one.
+                store.issue(self.user, "111111")
+                self.assertEqual(store.verify(self.user, "123456"), OtpStatus.INVALID)
+
+                later = record.created_at + otp_lifetime() + timedelta(seconds=1)
+                with mock.patch("accounts.otp_store.timezone.now", return_value=later):
+                    self.assertEqual(store.verify(self.user, "111111"), OtpStatus.EXPIRED)
+                self.assertIsNone(store.latest(self.user))
+
+    def test_cache_store_record_outlives_the_code_for_the_cooldown(self):
+        with self.settings(OTP_EXPIRE_MINUTES=1, OTP_RESEND_COOLDOWN_SECONDS=300), \
+                mock.patch("accounts.otp_store.cache.set") as cache_set:
+            CacheOtpStore().issue(self.user, "123456")
+        self.assertEqual(cache_set.call_args.args[2], 300)
+
+
+class SlidingWindowCounterTests(TestCase):
+    def _at(self, seconds: float):
+        return mock.patch("accounts.otp_store.time.time", return_value=seconds)
+
+    def test_previous_window_fades_out(self):
+        counter = SlidingWindowCounter("test:sends", 60)
+        start = 60 * 1_000
+
+        with self._at(start + 5):
+            for _ in range(4):
+                counter.hit("user-1")
+            self.assertEqual(counter.count("user-1"), 4)
+            self.assertEqual(counter.count("user-2"), 0)
+
+        # Half way through the next window half of the previous one counts.
+        with self._at(start + 90):
+            self.assertEqual(counter.count("user-1"), 2)
+            counter.hit("user-1")
+            self.assertEqual(counter.count("user-1"), 3)
+
+        # Two windows on, the first bucket no longer counts at all.
+        with self._at(start + 120):
+            self.assertEqual(counter.count("user-1"), 1)
+        with self._at(start + 180):
+            self.assertEqual(counter.count("user-1"), 0)
+
+
+class SignInTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="pending", email="pending@example.com", password="Secret!123", is_active=False,
+        )
+
+    def test_inactive_account_cannot_sign_in(self):
+        for login_id in ("pending", "PENDING@example.com"):
+            with self.subTest(login_id=login_id):
+                self.assertIsNone(authenticate(username=login_id, password="Secret!123"))
+
+        response = self.client.post(
+            reverse("sign_in"), {"login-identifier": "pending", "password": "Secret!123"},
+        )
+        self.assertRedirects(response, reverse("sign_in"), fetch_redirect_response=False)
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+        self.user.is_active = True
+        self.user.save(update_fields=["is_active"])
+        self.assertEqual(authenticate(username="PENDING@example.com", password="Secret!123"), self.user)
+
+    def test_failed_login_checks_one_password(self):
+        with mock.patch("django.contrib.auth.hashers.PBKDF2PasswordHasher.encode", autospec=True,
+                        side_effect=lambda hasher, *args: "pbkdf2_sha256$1$salt$hash") as encode, \
+                self.assertNumQueries(1):
+            self.assertIsNone(authenticate(username="nobody", password="Secret!123"))
+        self.assertEqual(encode.call_count, 1)
+
+
+@override_settings(SMS_BACKEND="utils.sms.FakeBackend", SMS_RETRY_BACKOFF_SECONDS=5)
+class SmsOutboxTests(TestCase):
+    def setUp(self):
+        FakeBackend.outbox.clear()
+        self.addCleanup(FakeBackend.outbox.clear)
+
+    def test_claimed_messages_are_not_claimed_twice_until_the_lease_runs_out(self):
+        message = enqueue_sms("09120000000", "Code: 123456")
+
+        self.assertEqual(claim_batch(10), [message])
+        self.assertEqual(claim_batch(10), [])
+
+        with self.settings(SMS_CLAIM_LEASE_SECONDS=60):
+            SmsMessage.objects.filter(pk=message.pk).update(claimed_at=timezone.now() - timedelta(seconds=61))
+            self.assertEqual(claim_batch(10), [message])
+
+    def test_command_delivers_the_outbox(self):
+        enqueue_sms("09120000000", "Code: 123456")
+        enqueue_sms("09120000001", "Code: 654321")
+
+        call_command("send_sms_outbox", stdout=StringIO())
+
+        self.assertEqual(sorted(sent["receptor"] for sent in FakeBackend.outbox), ["09120000000", "09120000001"])
+        self.assertFalse(SmsMessage.objects.exclude(status=SmsMessage.Status.SENT).exists())
+        self.assertFalse(SmsMessage.objects.exclude(claimed_by="").exists())
+        self.assertFalse(SmsMessage.objects.exclude(message="").exists())
+
+    @override_settings(SMS_FAKE_FAILURE_RATE=1.0)
+    def test_failures_back_off_then_give_up(self):
+        message = enqueue_sms("09120000000", "Code: 123456")
+
+        self.assertEqual(drain_batch(max_attempts=2).retried, 1)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (SmsMessage.Status.PENDING, 1))
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        # Not due yet: nothing to claim.
+        self.assertEqual(drain_batch(max_attempts=2).retried, 0)
+
+        SmsMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_batch(max_attempts=2).failed, 1)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.message), (SmsMessage.Status.FAILED, 2, ""))
+        self.assertEqual(FakeBackend.outbox, [])
+
+    def test_admin_does_not_show_the_code(self):
+        message = enqueue_sms("09120000000", "Code: 123456")
+        admin = get_user_model().objects.create_superuser(username="admin", password="pw")
+        self.client.force_login(admin)
+
+        response = self.client.get(reverse("admin:accounts_smsmessage_change", args=[message.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "123456")
+
+    def test_purge_deletes_finished_messages_past_the_otp_lifetime(self):
+        old = timezone.now() - otp_lifetime() - timedelta(seconds=1)
+        messages = {
+            status: enqueue_sms("09120000000", "Code: 123456")
+            for status in (SmsMessage.Status.SENT, SmsMessage.Status.FAILED, SmsMessage.Status.PENDING)
+        }
+        for status, message in messages.items():
+            SmsMessage.objects.filter(pk=message.pk).update(status=status, created_at=old)
+        recent = enqueue_sms("09120000001", "Code: 654321")
+        SmsMessage.objects.filter(pk=recent.pk).update(status=SmsMessage.Status.SENT)
+
+        call_command("purge_expired_otps", batch_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            set(SmsMessage.objects.values_list("pk", flat=True)),
+            {messages[SmsMessage.Status.PENDING].pk, recent.pk},
+        )
@@ -4,14 +4,16 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.conf import settings
+from django.db import transaction
 
 import random as rnd
 from datetime import timedelta
 
 from cart.cart import Cart
 from cart.functions import merge_session_cart_into_db, load_db_cart_into_session
+from cart.holds import hold_owner, transfer_holds, user_hold_owner
 from .forms import SignUpForm, OtpForm
-from .models import OtpCode
+from .otp_store import OtpStatus, get_otp_store, otp_send_counter
 from utils import otputils
 
 User = get_user_model()
@@ -30,15 +32,15 @@ def sign_up(request):
         form = SignUpForm(request.POST)
 
         if form.is_valid():
-            user = form.save(commit=False)
-            user.is_active = False
-            user.save()
-            
-            OtpCode.objects.filter(user=user).delete()
-            
             code = generate_otp()
-            OtpCode.objects.create(user=user, code=code)
-            otputils.send_Otp_Code(user.phone_number, code)
+            with transaction.atomic():
+                user = form.save(commit=False)
+                user.is_active = False
+                user.save()
+                
+                get_otp_store().issue(user, code)
+                otputils.queue_otp_code(user.phone_number, code)
+            otp_send_counter.hit(user.pk)
             
             request.session['pending_user_id'] = user.id
             
@@ -80,7 +82,8 @@ def otp_verification(request):
         messages.error(request, "No pending verification found. Please sign up again.")
         return redirect('sign_up')
     
-    latest_otp = OtpCode.objects.filter(user=user).order_by('-created_at').first()
+    otp_store = get_otp_store()
+    latest_otp = otp_store.latest(user)
     
     cooldown = getattr(settings, "OTP_RESEND_COOLDOWN_SECONDS", 60)
     cooldown_left = 0
@@ -93,20 +96,18 @@ def otp_verification(request):
         if form.is_valid():
             code = form.cleaned_data['code']
             
-            otp = OtpCode.objects.filter(user=user, code=code).order_by('-created_at').first()
-            if not otp:
+            status = otp_store.verify(user, code)
+            if status == OtpStatus.INVALID:
                 messages.error(request, "Invalid verification code.")
                 return redirect('otp_verification')
             
-            expire_minutes = getattr(settings, "OTP_EXPIRE_MINUTES", 2)
-            if timezone.now() > otp.created_at + timedelta(minutes=expire_minutes):
-                otp.delete()
+            if status == OtpStatus.EXPIRED:
                 messages.error(request, "Code expired. Please request a new code.")
                 return redirect('otp_verification')
             
             user.is_active = True
             user.save()
-            otp.delete()
+            otp_store.discard(user)
             request.session.pop('pending_user_id', None)
                 
             messages.success(request, 'You\'re account has been verified Successfully')
@@ -132,7 +133,8 @@ def resend_otp(request):
     now = timezone.now()
     
     cooldown = getattr(settings, "OTP_RESEND_COOLDOWN_SECONDS", 120)
-    latest_otp = OtpCode.objects.filter(user=user).order_by('-created_at').first()
+    otp_store = get_otp_store()
+    latest_otp = otp_store.latest(user)
     
     if latest_otp and now < latest_otp.created_at + timedelta(seconds=cooldown):
         left = int((latest_otp.created_at + timedelta(seconds=cooldown) - now).total_seconds())
@@ -140,17 +142,15 @@ def resend_otp(request):
         return redirect('otp_verification')
     
     max_per_hour = getattr(settings, "OTP_MAX_RESENDS_PER_HOUR", 5)
-    one_hour_ago = now - timedelta(hours=1)
-    resend_count = OtpCode.objects.filter(user=user, created_at__gte=one_hour_ago).count()
-    if resend_count >= max_per_hour:
+    if otp_send_counter.count(user.pk) >= max_per_hour:
         messages.error(request, "Too many resend attempts. Please try again later.")
         return redirect('otp_verification')
     
-    OtpCode.objects.filter(user=user).delete()
-    
     code = generate_otp()
-    OtpCode.objects.create(user=user, code=code)
-    otputils.send_Otp_Code(user.phone_number, code)
+    with transaction.atomic():
+        otp_store.issue(user, code)
+        otputils.queue_otp_code(user.phone_number, code)
+    otp_send_counter.hit(user.pk)
     
     messages.success(request, "A new verification code has been sent.")
     return redirect('otp_verification')
@@ -163,19 +163,17 @@ def sign_in(request):
 
         user = authenticate(request, username=login_id, password=password)
 
-        if user is None:
-            try:
-                user_obj = User.objects.get(email=login_id)
-                user = authenticate(request, username=user_obj.username, password=password)
-            except User.DoesNotExist:
-                pass
-
         if user is not None:
             cart = Cart(request)
+            guest_owner = hold_owner(request, create=False)
             
             login(request, user)
             
+            if guest_owner is not None:
+                transfer_holds(guest_owner, user_hold_owner(user.pk))
             merge_session_cart_into_db(user, cart.cart)
+            # The guest copy now lives in the DB cart; drop it from guest storage.
+            cart.clear()
             
             load_db_cart_into_session(request)
             
@@ -1,3 +1,19 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import StockHold
+
+
+@admin.register(StockHold)
+class StockHoldAdmin(admin.ModelAdmin):
+    list_display = ("id", "owner", "product", "quantity", "expires_at")
+    
+    list_select_related = ("product",)
+    
+    search_fields = ("owner",)
+    
+    ordering = ("expires_at",)
+    
+    # Edits here would not be mirrored into Product.held.
+    readonly_fields = ("owner", "product", "quantity", "expires_at", "created_at")
+    
+    list_per_page = 50
@@ -1,93 +1,148 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
 from decimal import Decimal
+from core.events import emit
 from products.models import Product
+from .holds import hold_line, hold_owner, release_holds
+from .storage import get_cart_storage
 
+# Request attribute holding the memoized CartSnapshot for that request.
+SNAPSHOT_REQUEST_ATTR = '_cart_snapshot'
 
-class Cart:
-    def __init__(self, request):
-        self.session = request.session
-        cart = self.session.get('cart')
-        
+
+def invalidate_snapshot(request) -> None:
+    request.__dict__.pop(SNAPSHOT_REQUEST_ATTR, None)
+
+
+@dataclass(frozen=True, slots=True)
+class CartLine:
+    product: Product
+    quantity: int
+    price: Decimal
+    total_price: Decimal
+
+
+@dataclass(frozen=True, slots=True)
+class CartSnapshot:
+    lines: tuple[CartLine, ...]
+    total_price: Decimal
+    
+    @classmethod
+    def build(cls, cart: dict[str, int]) -> CartSnapshot:
         if not cart:
-            cart = self.session['cart'] = {}
+            return cls(lines=(), total_price=Decimal('0.00'))
+        
+        # Prices from the primary: the replica is only synced by hand.
+        products = Product.objects.using('default').select_related('category').in_bulk(
+            [int(product_id) for product_id in cart]
+        )
+        
+        lines = []
+        for product_id, quantity in cart.items():
+            product = products.get(int(product_id))
+            if product is None:
+                continue
+            
+            # Prices are resolved now, not remembered from when the line was added.
+            lines.append(CartLine(
+                product=product,
+                quantity=quantity,
+                price=product.price,
+                total_price=product.price * quantity,
+            ))
         
-        self.cart = cart
+        return cls(
+            lines=tuple(lines),
+            total_price=sum((line.total_price for line in lines), Decimal('0.00')),
+        )
+    
+    def __iter__(self):
+        return iter(self.lines)
+    
+    def __len__(self):
+        return len(self.lines)
+
+
+class Cart:
+    def __init__(self, request):
+        self.request = request
+        self.storage = get_cart_storage(request)
+        self.cart = self.storage.load()
 
     def add(self, product, quantity=1):
         product_id = str(product.id)
         
-        if product.stock < quantity:
-            return
-        
-        if product_id not in self.cart:
-            self.cart[product_id] = {
-                'quantity': 0,
-                'price': str(product.price)
-            }
-        
-        new_quantity = self.cart[product_id]['quantity'] + quantity
+        new_quantity = self.cart.get(product_id, 0) + quantity
+        # The hold decides how many units the cart gets to keep.
+        new_quantity = hold_line(hold_owner(self.request), product.id, new_quantity)
         
         if new_quantity <= 0:
-            del self.cart[product_id]
-        
-        elif new_quantity <= product.stock:
-            self.cart[product_id]['quantity'] = new_quantity
-        print(f"\n\n\n\nThis is Cart:\n{self.cart}\n\n\n\n")
+            self.cart.pop(product_id, None)
+        else:
+            self.cart[product_id] = new_quantity
+        emit("cart.add", product_id=product.id, requested=quantity, quantity=new_quantity, lines=len(self.cart))
         self.save()
     
     def update(self, product, quantity):
         product_id = str(product.id)
         
         if product_id in self.cart:
+            quantity = hold_line(hold_owner(self.request), product.id, quantity)
             if quantity > 0:
-                self.cart[product_id]['quantity'] = quantity
+                self.cart[product_id] = quantity
             else:
                 del self.cart[product_id]
             
-            print(f"\n\n\n\nThis is Cart:\n{self.cart}\n\n\n\n")
+            emit("cart.update", product_id=product.id, quantity=quantity, lines=len(self.cart))
             self.save()
     
     def save(self):
-        self.session.modified = True
+        self.storage.save(self.cart)
+        self.invalidate()
     
     def remove(self, product):
         product_id = str(product.id)
         
         if product_id in self.cart:
             del self.cart[product_id]
-            print(f"\n\n\n\nThis is Cart:\n{self.cart}\n\n\n\n")
+            owner = hold_owner(self.request, create=False)
+            if owner is not None:
+                release_holds(owner, [product.id])
+            emit("cart.remove", product_id=product.id, lines=len(self.cart))
             self.save()
     
     def __len__(self):
         return len(self.cart)
     
-    def __iter__(self):
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        
-        for product in products:
-            self.cart[str(product.id)]['product'] = product
+    def snapshot(self) -> CartSnapshot:
+        """
+        Immutable line items for this request, built with a single query.
         
-        for item in self.cart.values():
-            item['price'] = Decimal(item['price'])
-            item['total_price'] = Decimal(item['price'] * item['quantity'])
-            print(f"\n\n\n{item}\n\n\n")
-            yield item
+        Memoized on the request so the header, the cart page and checkout
+        all share one fetch; any mutation through this class drops it.
+        """
+        snapshot = getattr(self.request, SNAPSHOT_REQUEST_ATTR, None)
+        if snapshot is None:
+            snapshot = CartSnapshot.build(self.cart)
+            setattr(self.request, SNAPSHOT_REQUEST_ATTR, snapshot)
+        return snapshot
+    
+    def invalidate(self):
+        invalidate_snapshot(self.request)
+    
+    def __iter__(self):
+        return iter(self.snapshot())
     
     def get_quantity(self, product):
-        product_id = str(product.id)
-        if product_id in self.cart:
-            return self.cart[product_id]['quantity']
-        return 0
+        return self.cart.get(str(product.id), 0)
     
     def get_total_price(self):
-        return sum(
-            Decimal(item['price'] * item['quantity'])
-            for item in self.cart.values()
-        )
+        return self.snapshot().total_price
     
     def get_total_items_in_cart(self):
         return len(self.cart.keys())
 
     def clear(self):
-        self.session.pop('cart', None)
+        self.cart = {}
         self.save()
@@ -1,4 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
 from .cart import Cart
+from .storage import get_cart_storage
 
 def cart(request):
-    return {'cart': Cart(request)}
+    # Nothing here touches the session until a template actually reads it.
+    return {
+        'cart': SimpleLazyObject(lambda: Cart(request)),
+        'cart_count': lambda: get_cart_storage(request).count(),
+    }
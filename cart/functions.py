@@ -1,43 +1,73 @@
 from django.db import transaction
+from django.db.models import F
 
 from products.models import Product
+from .cart import invalidate_snapshot
+from .holds import hold_line, release_holds, user_hold_owner
+from .storage import SessionCartStorage, normalize_cart
 from .models import UserCart, CartItem
 
+# UserCart.version the session copy of the cart was last synced with.
+CART_VERSION_SESSION_KEY = "cart_version"
+
 
 def get_or_create_user_cart(user) -> UserCart:
     db_cart, _ = UserCart.objects.get_or_create(user=user)
     return db_cart
 
 
+def _bump_version(db_cart: UserCart) -> int:
+    UserCart.objects.filter(pk=db_cart.pk).update(version=F("version") + 1)
+    db_cart.version += 1
+    return db_cart.version
+
+
 @transaction.atomic
 def merge_session_cart_into_db(user, session_cart: dict) -> None:
     if not session_cart:
         return
     
     db_cart = get_or_create_user_cart(user)
+    session_cart = normalize_cart(session_cart)
     
-    for product_id_str, item_data in session_cart.items():
-        product_id = int(product_id_str)
-        session_qty = int(item_data.get("quantity", 0))
-        if session_qty <= 0:
-            continue
-    
-    product = Product.objects.select_for_update().get(pk=product_id)
+    owner = user_hold_owner(user.pk)
     
-    cart_item = CartItem.objects.filter(cart=db_cart, product_id=product_id).first()
-    db_qty = cart_item.quantity if cart_item else 0
+    existing_ids = set(
+        Product.objects.filter(pk__in=[int(pid) for pid in session_cart]).values_list("id", flat=True)
+    )
+    items_by_product = {
+        item.product_id: item
+        for item in CartItem.objects.filter(cart=db_cart, product_id__in=existing_ids)
+    }
     
-    new_qty = db_qty + session_qty
-    if new_qty > product.stock:
-        new_qty = product.stock
+    for product_id_str, session_qty in session_cart.items():
+        product_id = int(product_id_str)
+        
+        if product_id not in existing_ids:
+            # Deleted since it was put in the guest cart.
+            continue
+        
+        cart_item = items_by_product.get(product_id)
+        db_qty = cart_item.quantity if cart_item else 0
+        
+        # Capped by what can be held; the guest's holds were handed to the user first.
+        new_qty = hold_line(owner, product_id, db_qty + session_qty)
+        
+        if new_qty <= 0:
+            CartItem.objects.filter(cart=db_cart, product_id=product_id).delete()
+        elif cart_item:
+            cart_item.quantity = new_qty
+            cart_item.save(update_fields=["quantity"])
+        else:
+            CartItem.objects.create(cart=db_cart, product_id=product_id, quantity=new_qty)
     
-    if new_qty <= 0:
-        CartItem.objects.filter(cart=db_cart, product_id=product_id).delete()
-    elif cart_item:
-        cart_item.quantity = new_qty
-        cart_item.save(update_fields=["quantity"])
-    else:
-        CartItem.objects.create(cart=db_cart, product_id=product_id, quantity=new_qty)
+    _bump_version(db_cart)
+
+def _store_session_cart(request, session_cart: dict, version: int | None) -> None:
+    SessionCartStorage(request).save(session_cart)
+    if version is not None:
+        request.session[CART_VERSION_SESSION_KEY] = version
+    invalidate_snapshot(request)
 
 def load_db_cart_into_session(request) -> None:
     user = request.user
@@ -45,51 +75,105 @@ def load_db_cart_into_session(request) -> None:
         return
     
     db_cart = UserCart.objects.filter(user=user).first()
-    session_cart = request.session.get("cart") or {}
+    session_cart = SessionCartStorage(request).load()
     
     if not db_cart:
-        request.session["cart"] = session_cart
-        request.session.modified = True
+        _store_session_cart(request, session_cart, None)
         return
     
-    new_session_cart = {}
-    items = (
-        CartItem.objects.select_related("product").filter(cart=db_cart)
-    )
-    for item in items:
-        new_session_cart[str(item.product_id)] = {
-            "quantity": item.quantity,
-            "price": str(item.product.price),
-        }
+    new_session_cart = {
+        str(product_id): quantity
+        for product_id, quantity in CartItem.objects.filter(cart=db_cart).values_list("product_id", "quantity")
+    }
     
-    request.session["cart"] = new_session_cart
-    request.session.modified = True
+    _store_session_cart(request, new_session_cart, db_cart.version)
+
+def refresh_session_cart_if_stale(request) -> None:
+    """
+    Reload the session cart only if the DB cart moved on without it, e.g.
+    the user changed their cart from another device. Costs one indexed
+    lookup when nothing changed.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return
+    
+    db_version = (
+        UserCart.objects.filter(user=user).values_list("version", flat=True).first()
+    )
+    if db_version is not None and db_version != request.session.get(CART_VERSION_SESSION_KEY):
+        load_db_cart_into_session(request)
 
 
 @transaction.atomic
-def set_db_item_quantity(user, product_id: int, quantity: int) -> None:
-    db_cart = get_or_create_user_cart(user)
-    product = Product.objects.select_for_update().get(pk=product_id)
+def set_db_item_quantity(user, product_id: int, quantity: int) -> int:
+    return _set_item_quantity(get_or_create_user_cart(user), product_id, quantity)
+
+def _set_item_quantity(db_cart: UserCart, product_id: int, quantity: int) -> int:
+    quantity = hold_line(user_hold_owner(db_cart.user_id), product_id, quantity)
     
     if quantity <= 0:
         CartItem.objects.filter(cart=db_cart, product_id=product_id).delete()
-        return
-    
-    if quantity > product.stock:
-        quantity = product.stock
+        return 0
     
     CartItem.objects.update_or_create(
         cart=db_cart,
         product_id=product_id,
         defaults={"quantity": quantity},
     )
+    return quantity
 
 def remove_cart_item_from_db(user, product_id):
     db_cart = UserCart.objects.filter(user=user).first()
     if db_cart:
         CartItem.objects.filter(cart=db_cart, product_id=product_id).delete()
+        release_holds(user_hold_owner(user.pk), [product_id])
+        _bump_version(db_cart)
 
 def clear_user_cart_from_db(user):
     db_cart = UserCart.objects.filter(user=user).first()
     if db_cart:
         CartItem.objects.filter(cart=db_cart).delete()
+        release_holds(user_hold_owner(user.pk))
+        _bump_version(db_cart)
+
+
+@transaction.atomic
+def sync_cart_line(request, product, quantity: int) -> None:
+    """
+    Write one line of an authenticated user's cart to both stores.
+    
+    The DB row is updated and UserCart.version bumped; the session then
+    gets just that line patched in. The whole cart is only reloaded when
+    the session was already behind the DB before this change.
+    """
+    user = request.user
+    db_cart = get_or_create_user_cart(user)
+    in_sync = request.session.get(CART_VERSION_SESSION_KEY) == db_cart.version
+    
+    quantity = _set_item_quantity(db_cart, product.id, quantity)
+    version = _bump_version(db_cart)
+    
+    if not in_sync:
+        load_db_cart_into_session(request)
+        return
+    
+    session_cart = SessionCartStorage(request).load()
+    if quantity <= 0:
+        session_cart.pop(str(product.id), None)
+    else:
+        session_cart[str(product.id)] = quantity
+    
+    _store_session_cart(request, session_cart, version)
+
+@transaction.atomic
+def sync_clear_cart(request) -> None:
+    user = request.user
+    db_cart = UserCart.objects.filter(user=user).first()
+    if not db_cart:
+        _store_session_cart(request, {}, None)
+        return
+    
+    CartItem.objects.filter(cart=db_cart).delete()
+    release_holds(user_hold_owner(user.pk))
+    _store_session_cart(request, {}, _bump_version(db_cart))
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from products.models import Product
+from products import availability
+from .models import StockHold
+
+# Request attribute holding a guest hold token minted during this request;
+# CartStorageMiddleware turns it into a cookie.
+NEW_HOLD_TOKEN_ATTR = '_new_cart_hold_token'
+
+
+def hold_ttl() -> timedelta:
+    return timedelta(minutes=getattr(settings, 'CART_HOLD_MINUTES', 15))
+
+
+def hold_cookie_name() -> str:
+    return getattr(settings, 'CART_COOKIE_NAME', 'cart') + '_hold'
+
+
+def user_hold_owner(user_id: int) -> str:
+    return f'user:{user_id}'
+
+
+def hold_owner(request, create: bool = True) -> str | None:
+    """
+    Owner key of the request's holds. Guests are given a random token
+    cookie the first time one is needed; with `create=False` a guest
+    without one gets None.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user_hold_owner(user.pk)
+
+    token = request.COOKIES.get(hold_cookie_name()) or getattr(request, NEW_HOLD_TOKEN_ATTR, None)
+    if token is None:
+        if not create:
+            return None
+        token = secrets.token_urlsafe(18)
+        setattr(request, NEW_HOLD_TOKEN_ATTR, token)
+    return f'guest:{token}'
+
+
+def _release_held(quantities: dict[int, int]) -> None:
+    """Give `quantities` (product id -> units) back to Product.held in one UPDATE."""
+    if not quantities:
+        return
+
+    Product.objects.filter(pk__in=quantities).update(
+        held=Greatest(
+            Case(
+                *(When(pk=product_id, then=F('held') - qty) for product_id, qty in quantities.items()),
+                default=F('held'),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+    )
+
+
+@transaction.atomic
+def hold_line(owner: str, product_id: int, quantity: int) -> int:
+    """
+    Set the owner's hold on a product to `quantity` and restart its timer.
+
+    Growing a hold only succeeds while `stock - held` covers the extra
+    units (a conditional UPDATE, no row lock); otherwise whatever is left
+    is taken. Returns the quantity actually held, which is what the cart
+    should keep.
+    """
+    quantity = max(quantity, 0)
+    hold = StockHold.objects.select_for_update().filter(owner=owner, product_id=product_id).first()
+    current = hold.quantity if hold else 0
+
+    extra = quantity - current
+    if extra > 0:
+        granted = Product.objects.filter(
+            pk=product_id, stock__gte=F('held') + extra
+        ).update(held=F('held') + extra)
+
+        if not granted:
+            row = Product.objects.filter(pk=product_id).values_list('stock', 'held').first()
+            spare = max(row[0] - row[1], 0) if row else 0
+            if spare and Product.objects.filter(
+                pk=product_id, stock__gte=F('held') + spare
+            ).update(held=F('held') + spare):
+                extra = spare
+            else:
+                extra = 0
+            quantity = current + extra
+    elif extra < 0:
+        _release_held({product_id: -extra})
+
+    if quantity <= 0:
+        if hold:
+            hold.delete()
+    elif hold:
+        hold.quantity = quantity
+        hold.expires_at = timezone.now() + hold_ttl()
+        hold.save(update_fields=['quantity', 'expires_at'])
+    else:
+        StockHold.objects.create(
+            owner=owner,
+            product_id=product_id,
+            quantity=quantity,
+            expires_at=timezone.now() + hold_ttl(),
+        )
+
+    availability.adjust({product_id: current - quantity})
+
+    return quantity
+
+
+@transaction.atomic
+def release_holds(owner: str, product_ids=None) -> None:
+    holds = StockHold.objects.select_for_update().filter(owner=owner)
+    if product_ids is not None:
+        holds = holds.filter(product_id__in=product_ids)
+
+    released = dict(holds.values_list('product_id', 'quantity'))
+    if not released:
+        return
+
+    _release_held(released)
+    StockHold.objects.filter(owner=owner, product_id__in=released).delete()
+    availability.adjust(released)
+
+
+@transaction.atomic
+def transfer_holds(from_owner: str, to_owner: str) -> None:
+    """
+    Hand a guest's holds to the user who just signed in. Units stay held,
+    so Product.held does not move; holds on the same product are summed.
+    """
+    if from_owner == to_owner:
+        return
+
+    expires_at = timezone.now() + hold_ttl()
+    existing = {
+        hold.product_id: hold
+        for hold in StockHold.objects.select_for_update().filter(owner=to_owner)
+    }
+
+    for hold in StockHold.objects.select_for_update().filter(owner=from_owner):
+        target = existing.get(hold.product_id)
+        if target is None:
+            hold.owner = to_owner
+            hold.expires_at = expires_at
+            hold.save(update_fields=['owner', 'expires_at'])
+        else:
+            target.quantity += hold.quantity
+            target.expires_at = expires_at
+            target.save(update_fields=['quantity', 'expires_at'])
+            hold.delete()
+
+
+def owner_holds(owner: str, product_ids, *, lock: bool = False) -> dict[int, int]:
+    """Product id -> units the owner holds, expired or not, among `product_ids`."""
+    holds = StockHold.objects.filter(owner=owner, product_id__in=product_ids)
+    if lock:
+        holds = holds.select_for_update()
+    return dict(holds.values_list('product_id', 'quantity'))
+
+
+def drop_holds(owner: str, product_ids) -> None:
+    """Delete hold rows whose units the caller already took out of Product.held."""
+    StockHold.objects.filter(owner=owner, product_id__in=product_ids).delete()
+
+
+def release_expired(batch_size: int = 500, now=None) -> int:
+    """Release one batch of expired holds; returns how many were released."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = list(
+            StockHold.objects.select_for_update(skip_locked=True)
+            .filter(expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('id', 'product_id', 'quantity')[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        released: dict[int, int] = {}
+        for _, product_id, quantity in rows:
+            released[product_id] = released.get(product_id, 0) + quantity
+
+        _release_held(released)
+        StockHold.objects.filter(id__in=[row[0] for row in rows]).delete()
+        availability.adjust(released)
+
+    return len(rows)
+
+
+def reconcile_held() -> int:
+    """
+    Recompute Product.held from the hold rows, fixing any drift. Cached
+    availability follows with the next `availability.reconcile()`.
+    """
+    totals = (
+        StockHold.objects.filter(product=OuterRef('pk'))
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    return Product.objects.update(held=Coalesce(Subquery(totals), Value(0)))
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cart.holds import reconcile_held, release_expired
+from products import availability
+
+
+class Command(BaseCommand):
+    help = "Give the units of expired cart holds back to available stock, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep sweeping instead of exiting once nothing has expired.")
+        parser.add_argument("--interval", type=float, default=30.0,
+                            help="Seconds to sleep between sweeps when idle (with --loop).")
+        parser.add_argument("--reconcile", action="store_true",
+                            help="Recompute Product.held from the hold rows after sweeping, "
+                                 "then the cached availability.")
+
+    def handle(self, *args, **options):
+        batch_size: int = options["batch_size"]
+        loop: bool = options["loop"]
+        interval: float = options["interval"]
+
+        released = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                count = release_expired(batch_size)
+                released += count
+                if count:
+                    self.stdout.write(f"released={count}")
+                    continue
+
+                if not loop:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+        if options["reconcile"]:
+            self.stdout.write(f"Reconciled held units on {reconcile_held()} products.")
+            availability.reconcile()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Released {released} expired holds in {elapsed:.2f}s."
+        ))
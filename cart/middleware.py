@@ -0,0 +1,33 @@
+from django.conf import settings
+
+from .holds import NEW_HOLD_TOKEN_ATTR, hold_cookie_name
+from .storage import STORAGES_REQUEST_ATTR
+
+
+class CartStorageMiddleware:
+    """
+    Writes guest carts kept outside the session (cookie/cache) to the
+    response, along with the token of any stock hold a guest just took.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        
+        for storage in request.__dict__.get(STORAGES_REQUEST_ATTR, {}).values():
+            storage.persist(request, response)
+        
+        token = request.__dict__.get(NEW_HOLD_TOKEN_ATTR)
+        if token is not None:
+            response.set_cookie(
+                hold_cookie_name(),
+                token,
+                max_age=getattr(settings, 'CART_COOKIE_AGE', 60 * 60 * 24 * 30),
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+        
+        return response
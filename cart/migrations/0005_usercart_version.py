@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0004_alter_cartitem_quantity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="usercart",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
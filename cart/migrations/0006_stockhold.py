@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0005_usercart_version"),
+        ("products", "0006_product_held"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockHold",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("owner", models.CharField(max_length=64, verbose_name="Owner")),
+                ("quantity", models.PositiveIntegerField(verbose_name="Quantity")),
+                ("expires_at", models.DateTimeField(verbose_name="Expires at")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="holds",
+                        to="products.product",
+                        verbose_name="Product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["expires_at"], name="hold_expires_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("owner", "product"), name="unique_hold_owner_product"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -14,6 +14,9 @@ class UserCart(models.Model):
         related_name="cart",
     )
     
+    # Bumped on every write so a session copy of the cart can tell it is stale.
+    version = models.PositiveIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -51,3 +54,41 @@ class CartItem(models.Model):
     
     def __str__(self):
         return f"{self.product.price} x {self.quantity}"
+
+
+class StockHold(models.Model):
+    """
+    Units of a product set aside for one cart until `expires_at`.
+    
+    `owner` is "user:<pk>" or "guest:<token>" (see cart.holds.hold_owner).
+    Every change is mirrored into Product.held in the same transaction.
+    """
+    owner = models.CharField(
+        verbose_name=_('Owner'),
+        max_length=64,
+    )
+    
+    product = models.ForeignKey(
+        verbose_name=_('Product'),
+        to=Product,
+        on_delete=models.CASCADE,
+        related_name="holds",
+    )
+    
+    quantity = models.PositiveIntegerField(verbose_name=_('Quantity'))
+    
+    expires_at = models.DateTimeField(verbose_name=_('Expires at'))
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'product'], name='unique_hold_owner_product')
+        ]
+        indexes = [
+            # The sweeper walks holds in expiry order.
+            models.Index(fields=['expires_at'], name='hold_expires_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.owner}: {self.quantity} x product #{self.product_id}"
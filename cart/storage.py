@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import secrets
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+CART_SESSION_KEY = 'cart'
+
+# Number of lines in the session cart, kept next to it so the header badge
+# can be rendered without building a Cart.
+CART_COUNT_SESSION_KEY = 'cart_count'
+
+# Request attribute holding the storages used by that request, by class.
+STORAGES_REQUEST_ATTR = '_cart_storages'
+
+
+def normalize_cart(raw) -> dict[str, int]:
+    """
+    Compact cart: product id (str) -> quantity.
+
+    Also reads the old `{'quantity': n, 'price': '...'}` line format so carts
+    saved before the switch keep working.
+    """
+    cart = {}
+    for product_id, value in (raw or {}).items():
+        quantity = value.get('quantity', 0) if isinstance(value, dict) else value
+        try:
+            quantity = int(quantity)
+        except (TypeError, ValueError):
+            continue
+        if quantity > 0:
+            cart[str(product_id)] = quantity
+    return cart
+
+
+class SessionCartStorage:
+    """Cart inside the auth session; used for signed-in users."""
+
+    def __init__(self, request):
+        self.session = request.session
+
+    def load(self) -> dict[str, int]:
+        raw = self.session.get(CART_SESSION_KEY)
+        if not raw:
+            return {}
+
+        cart = normalize_cart(raw)
+        if cart != raw:
+            self.session[CART_SESSION_KEY] = cart
+        return self.session[CART_SESSION_KEY]
+
+    def save(self, cart: dict[str, int]) -> None:
+        if cart:
+            self.session[CART_SESSION_KEY] = cart
+        else:
+            self.session.pop(CART_SESSION_KEY, None)
+        self.session[CART_COUNT_SESSION_KEY] = len(cart)
+        self.session.modified = True
+
+    def count(self) -> int:
+        count = self.session.get(CART_COUNT_SESSION_KEY)
+        if count is None:
+            count = len(self.session.get(CART_SESSION_KEY) or {})
+        return count
+
+    def persist(self, request, response) -> None:
+        # SessionMiddleware writes the session.
+        pass
+
+
+class SignedCookieCartStorage:
+    """
+    Guest cart in a signed cookie: no server-side state and no session row
+    for visitors who only browse and add to cart.
+    """
+
+    salt = 'cart.storage'
+
+    def __init__(self, request):
+        self.cookie_name = getattr(settings, 'CART_COOKIE_NAME', 'cart')
+        self.max_age = getattr(settings, 'CART_COOKIE_AGE', 60 * 60 * 24 * 30)
+        self.raw_cookie = request.COOKIES.get(self.cookie_name)
+        self._cart = None
+        self.modified = False
+
+    def load(self) -> dict[str, int]:
+        if self._cart is None:
+            raw = {}
+            if self.raw_cookie:
+                try:
+                    raw = signing.loads(self.raw_cookie, salt=self.salt, max_age=self.max_age)
+                except signing.BadSignature:
+                    raw = {}
+            self._cart = normalize_cart(raw)
+        return self._cart
+
+    def save(self, cart: dict[str, int]) -> None:
+        self._cart = cart
+        self.modified = True
+
+    def count(self) -> int:
+        return len(self.load())
+
+    def persist(self, request, response) -> None:
+        if not self.modified:
+            return
+
+        if not self._cart:
+            if self.raw_cookie:
+                response.delete_cookie(self.cookie_name, samesite='Lax')
+            return
+
+        response.set_cookie(
+            self.cookie_name,
+            signing.dumps(self._cart, salt=self.salt, compress=True),
+            max_age=self.max_age,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite='Lax',
+        )
+
+
+class CacheCartStorage:
+    """
+    Guest cart in the shared cache, found through a random token cookie.
+    Any worker may answer the guest's next request, so core.checks refuses
+    this storage on a per-process cache.
+    """
+
+    def __init__(self, request):
+        self.cookie_name = getattr(settings, 'CART_COOKIE_NAME', 'cart') + '_token'
+        self.max_age = getattr(settings, 'CART_COOKIE_AGE', 60 * 60 * 24 * 30)
+        self.token = request.COOKIES.get(self.cookie_name)
+        self._cart = None
+        self.modified = False
+
+    def _key(self) -> str:
+        return f'cart:guest:{self.token}'
+
+    def load(self) -> dict[str, int]:
+        if self._cart is None:
+            raw = cache.get(self._key()) if self.token else None
+            self._cart = normalize_cart(raw)
+        return self._cart
+
+    def save(self, cart: dict[str, int]) -> None:
+        self._cart = cart
+        self.modified = True
+
+    def count(self) -> int:
+        return len(self.load())
+
+    def persist(self, request, response) -> None:
+        if not self.modified:
+            return
+
+        if not self._cart:
+            if self.token:
+                cache.delete(self._key())
+            return
+
+        if not self.token:
+            self.token = secrets.token_urlsafe(24)
+            response.set_cookie(
+                self.cookie_name,
+                self.token,
+                max_age=self.max_age,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+        cache.set(self._key(), self._cart, self.max_age)
+
+
+def get_cart_storage(request):
+    """
+    The cart storage for the request's current user, created once per
+    request. Signed-in users always use the session (it is synced with
+    UserCart); guests use CART_GUEST_STORAGE.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        storage_class = SessionCartStorage
+    else:
+        storage_class = import_string(
+            getattr(settings, 'CART_GUEST_STORAGE', 'cart.storage.SessionCartStorage')
+        )
+
+    storages = request.__dict__.setdefault(STORAGES_REQUEST_ATTR, {})
+    if storage_class not in storages:
+        storages[storage_class] = storage_class(request)
+    return storages[storage_class]
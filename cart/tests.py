@@ -1,3 +1,250 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import QueryPlanAssertions, assert_query_budget, create_product, create_products
+from products.models import Product
+from .functions import load_db_cart_into_session, merge_session_cart_into_db
+from .holds import hold_line, reconcile_held, release_expired, transfer_holds
+from .models import CartItem, StockHold, UserCart
+from .storage import CacheCartStorage, SignedCookieCartStorage, normalize_cart
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite's")
+class CartQueryPlanTests(QueryPlanAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(3)
+        cls.user = get_user_model().objects.create_user(username="buyer", password="pw")
+        cart = UserCart.objects.create(user=cls.user)
+        CartItem.objects.create(cart=cart, product=cls.products[0], quantity=1)
+
+    def test_merge_session_cart(self):
+        session_cart = {str(product.id): 2 for product in self.products}
+        with self.assertNoFullScans():
+            merge_session_cart_into_db(self.user, session_cart)
+
+    def test_items_by_cart(self):
+        self.assertNoFullScan(
+            CartItem.objects.filter(cart__user=self.user).values_list("product_id", "quantity")
+        )
+
+    def test_load_db_cart_into_session(self):
+        self.client.force_login(self.user)
+        request = self.client.get("/").wsgi_request
+        with self.assertNoFullScans():
+            load_db_cart_into_session(request)
+
+
+class CartQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(10)
+        cls.user = get_user_model().objects.create_user(username="buyer", password="pw")
+
+    def _fill_cart(self):
+        for product in self.products:
+            self.client.post(reverse("cart_add", args=[product.id]))
+
+    def test_guest_cart_page_does_not_grow_with_lines(self):
+        self._fill_cart()
+        with assert_query_budget(1):
+            self.client.get(reverse("cart_detail"))
+
+    def test_user_cart_page_does_not_grow_with_lines(self):
+        self.client.force_login(self.user)
+        self._fill_cart()
+        # Session, user, cart version check and one bulk product load.
+        with assert_query_budget(4):
+            self.client.get(reverse("cart_detail"))
+
+
+class CartSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_product(stock=5)
+        cls.user = get_user_model().objects.create_user(username="buyer", password="pw")
+
+    def test_second_device_sees_first_devices_changes(self):
+        phone, laptop = self.client, self.client_class()
+        phone.force_login(self.user)
+        laptop.force_login(self.user)
+        product = self.product
+
+        phone.post(reverse("cart_add", args=[product.id]))
+        laptop.post(reverse("cart_add", args=[product.id]))
+        phone.post(reverse("cart_update", args=[product.id]), {"action": "increase"})
+
+        item = CartItem.objects.get(cart__user=self.user, product=product)
+        self.assertEqual(item.quantity, 3)
+        laptop.post(reverse("cart_update", args=[product.id]), {"action": "decrease"})
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 2)
+
+
+class StockHoldTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_product(stock=5)
+
+    def _held(self, product=None):
+        return Product.objects.get(pk=(product or self.product).pk).held
+
+    def _holds(self):
+        return dict(StockHold.objects.values_list("owner", "quantity"))
+
+    def test_full_hold_and_shrink(self):
+        self.assertEqual(hold_line("guest:a", self.product.pk, 3), 3)
+        self.assertEqual(self._held(), 3)
+        self.assertEqual(self._holds(), {"guest:a": 3})
+
+        self.assertEqual(hold_line("guest:a", self.product.pk, 1), 1)
+        self.assertEqual(self._held(), 1)
+        self.assertEqual(self._holds(), {"guest:a": 1})
+
+        self.assertEqual(hold_line("guest:a", self.product.pk, 0), 0)
+        self.assertEqual(self._held(), 0)
+        self.assertEqual(self._holds(), {})
+
+    def test_short_stock_grants_what_is_left(self):
+        hold_line("guest:a", self.product.pk, 3)
+        self.assertEqual(hold_line("guest:b", self.product.pk, 4), 2)
+        self.assertEqual(self._held(), 5)
+        self.assertEqual(self._holds(), {"guest:a": 3, "guest:b": 2})
+
+        # Nothing spare: the existing hold is kept as it was.
+        self.assertEqual(hold_line("guest:b", self.product.pk, 3), 2)
+        self.assertEqual(hold_line("guest:c", self.product.pk, 1), 0)
+        self.assertEqual(self._held(), 5)
+        self.assertEqual(self._holds(), {"guest:a": 3, "guest:b": 2})
+
+    def test_release_expired_in_batches(self):
+        for owner in ("guest:a", "guest:b", "guest:c"):
+            hold_line(owner, self.product.pk, 1)
+        hold_line("guest:d", self.product.pk, 2)
+        StockHold.objects.exclude(owner="guest:d").update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(release_expired(batch_size=2), 2)
+        self.assertEqual(self._held(), 3)
+        self.assertEqual(release_expired(batch_size=2), 1)
+        self.assertEqual(release_expired(batch_size=2), 0)
+        self.assertEqual(self._held(), 2)
+        self.assertEqual(self._holds(), {"guest:d": 2})
+
+        later = timezone.now() + timedelta(days=1)
+        self.assertEqual(release_expired(batch_size=2, now=later), 1)
+        self.assertEqual(self._held(), 0)
+
+    def test_transfer_on_sign_in(self):
+        side = create_product("side", stock=5)
+        hold_line("guest:a", self.product.pk, 2)
+        hold_line("guest:a", side.pk, 1)
+        hold_line("user:1", self.product.pk, 1)
+
+        transfer_holds("guest:a", "user:1")
+
+        holds = dict(
+            StockHold.objects.filter(owner="user:1").values_list("product_id", "quantity")
+        )
+        self.assertEqual(holds, {self.product.pk: 3, side.pk: 1})
+        self.assertFalse(StockHold.objects.filter(owner="guest:a").exists())
+        self.assertEqual(self._held(), 3)
+        self.assertEqual(self._held(side), 1)
+
+    def test_reconcile_corrects_drift(self):
+        side = create_product("side", stock=5)
+        hold_line("guest:a", self.product.pk, 2)
+        hold_line("guest:b", self.product.pk, 1)
+        Product.objects.update(held=4)
+
+        reconcile_held()
+
+        self.assertEqual(self._held(), 3)
+        self.assertEqual(self._held(side), 0)
+
+
+class CartStorageTests(SimpleTestCase):
+    def _request(self, **cookies):
+        request = RequestFactory().get("/")
+        request.COOKIES.update(cookies)
+        return request
+
+    def _persist(self, storage, cart):
+        storage.save(cart)
+        response = HttpResponse()
+        storage.persist(None, response)
+        return response
+
+    def test_normalize_old_session_format(self):
+        old = {"1": {"quantity": 2, "price": "9.99"}, "2": 3, "3": {"quantity": 0}, "4": "x", 5: "1"}
+        self.assertEqual(normalize_cart(old), {"1": 2, "2": 3, "5": 1})
+        self.assertEqual(normalize_cart(None), {})
+
+    def test_signed_cookie_round_trip(self):
+        response = self._persist(SignedCookieCartStorage(self._request()), {"1": 2})
+        value = response.cookies["cart"].value
+
+        storage = SignedCookieCartStorage(self._request(cart=value))
+        self.assertEqual(storage.load(), {"1": 2})
+
+        response = self._persist(storage, {})
+        self.assertEqual(response.cookies["cart"].value, "")
+
+    def test_tampered_cookie_is_ignored(self):
+        value = signing.dumps({"1": 2}, salt=SignedCookieCartStorage.salt)
+        payload, signature = value.rsplit(":", 1)
+        forged = signing.dumps({"1": 99}).rsplit(":", 1)[0] + ":" + signature
+
+        for cookie in (forged, payload + ":x", "garbage"):
+            with self.subTest(cookie=cookie):
+                self.assertEqual(SignedCookieCartStorage(self._request(cart=cookie)).load(), {})
+
+    def test_unchanged_cart_writes_nothing(self):
+        storage = SignedCookieCartStorage(self._request())
+        storage.load()
+        response = HttpResponse()
+        storage.persist(None, response)
+        self.assertNotIn("cart", response.cookies)
+
+    def test_cache_round_trip(self):
+        response = self._persist(CacheCartStorage(self._request()), {"1": 2})
+        token = response.cookies["cart_token"].value
+        self.assertEqual(cache.get(f"cart:guest:{token}"), {"1": 2})
+
+        storage = CacheCartStorage(self._request(cart_token=token))
+        self.assertEqual(storage.load(), {"1": 2})
+
+        response = self._persist(storage, {})
+        self.assertIsNone(cache.get(f"cart:guest:{token}"))
+        self.assertNotIn("cart_token", response.cookies)
+
+
+class CartStorageMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_product(stock=5)
+
+    def test_guest_cart_and_hold_token_reach_the_response(self):
+        for storage, cookie in (
+            ("cart.storage.SignedCookieCartStorage", "cart"),
+            ("cart.storage.CacheCartStorage", "cart_token"),
+        ):
+            with self.subTest(storage=storage), override_settings(CART_GUEST_STORAGE=storage):
+                self.client.cookies.clear()
+                response = self.client.post(reverse("cart_add", args=[self.product.id]))
+                self.assertIn(cookie, response.cookies)
+                self.assertIn("cart_hold", response.cookies)
+
+                self.client.post(reverse("cart_add", args=[self.product.id]))
+                response = self.client.get(reverse("cart_detail"))
+                self.assertEqual([line.quantity for line in response.context["cart"]], [2])
+                self.assertNotIn("sessionid", self.client.cookies)
+                self.client.post(reverse("clear_cart"))
@@ -3,24 +3,28 @@ from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.utils.http import url_has_allowed_host_and_scheme
 
+from core.events import emit
 from products.models import Product
 from .cart import Cart
+from .holds import hold_owner, release_holds
 from .functions import (
-    load_db_cart_into_session,
-    set_db_item_quantity,
-    remove_cart_item_from_db,
-    clear_user_cart_from_db,
+    refresh_session_cart_if_stale,
+    sync_cart_line,
+    sync_clear_cart,
 )
 
 
 def cart_detail(request):
+    refresh_session_cart_if_stale(request)
     cart = Cart(request)
     
-    print(f"\n\n\nThis is Cart:\n\n\n{cart}\n\n\n")
+    emit("cart.detail_viewed", lines=len(cart), signed_in=request.user.is_authenticated)
     return render(request, 'cart_detail.html', {'cart': cart})
 
 @require_POST
 def cart_add(request, product_id):
+    # Another device may have changed the cart; read quantities from the DB's version.
+    refresh_session_cart_if_stale(request)
     cart = Cart(request)
     user = request.user
     product = get_object_or_404(Product, id=product_id)
@@ -28,19 +32,17 @@ def cart_add(request, product_id):
     redirect_to = request.POST.get("redirection_page") or request.META.get("HTTP_REFERER") or "cart_detail"
     
     if user.is_authenticated:
-        current_qty = 0
-        
         current_qty = cart.get_quantity(product)
-        set_db_item_quantity(user, product.id, current_qty + 1)
-        load_db_cart_into_session(request)
+        sync_cart_line(request, product, current_qty + 1)
     else:
         cart.add(product=product, quantity=1)
     
-    print(f"\n\nThis is Request.POST:\n{request.POST}\n\n\n\n{redirect_to}\n\n")
+    emit("cart.add_requested", product_id=product.id, signed_in=user.is_authenticated, redirect_to=redirect_to)
     return redirect(redirect_to)
 
 @require_POST
 def cart_update(request, product_id):
+    refresh_session_cart_if_stale(request)
     cart = Cart(request)
     user = request.user
     product = get_object_or_404(Product, id=product_id)
@@ -57,12 +59,11 @@ def cart_update(request, product_id):
         return redirect('cart_detail')
     
     if user.is_authenticated:
-        set_db_item_quantity(user, product.id, new_qty)
-        load_db_cart_into_session(request)
+        sync_cart_line(request, product, new_qty)
     else:
         cart.add(product, quantity=1 if action == "increase" else -1)
     
-    print(f"\n\nThis is Request.POST:\n{request.POST}\n\n")
+    emit("cart.update_requested", product_id=product.id, action=action, quantity=new_qty)
     return redirect('cart_detail')
 
 @require_POST
@@ -73,12 +74,11 @@ def remove_from_cart(request, product_id):
         
     if request.POST.get("action") == "delete":
         if user.is_authenticated:
-            remove_cart_item_from_db(user, product_id)
-            load_db_cart_into_session(request)
+            sync_cart_line(request, product, 0)
         else:
             cart.remove(product)
     
-    print(request.POST)
+    emit("cart.remove_requested", product_id=product.id, action=request.POST.get("action"))
     return redirect('cart_detail')
 
 @require_POST
@@ -87,13 +87,15 @@ def clear_cart(request):
     user = request.user
     
     if user.is_authenticated:
-        clear_user_cart_from_db(user)
-        load_db_cart_into_session(request)
+        sync_clear_cart(request)
         messages.success(request, "All products successfully removed from your cart.")
         return redirect('homepage')
     
     if cart.cart:
         cart.clear()
+        owner = hold_owner(request, create=False)
+        if owner is not None:
+            release_holds(owner)
         messages.success(request, "All products successfully removed from your cart.")
     else:
         messages.warning(request, "Your cart is already empty.")
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Backends every process shares, with atomic incr/decr.
+SHARED_CACHES = (
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+)
+
+
+def _shared_cache_users() -> list[str]:
+    """What in this configuration keeps state in the default cache."""
+    users = [
+        "products.availability (available units, moved by every worker and "
+        "reset by reconcile_availability)",
+        "products.conditional (catalog page validators)",
+        "accounts.otp_store.otp_send_counter (OTP resend limit)",
+    ]
+    if getattr(settings, "OTP_STORE", "").endswith(".CacheOtpStore"):
+        users.append("OTP_STORE (codes must verify on any worker)")
+    if getattr(settings, "CART_GUEST_STORAGE", "").endswith(".CacheCartStorage"):
+        users.append("CART_GUEST_STORAGE (guest carts must survive a change of worker)")
+    return users
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Refuse any default cache but Redis or Memcached once DEBUG is off.
+    Per-process caches give each worker its own counts and limits; the file
+    and database caches read then write on incr and cull on every set.
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if backend in SHARED_CACHES:
+        return []
+
+    message = f"The default cache ({backend}) is not Redis or Memcached."
+    hint = (
+        "It is used by " + "; ".join(_shared_cache_users())
+        + ". Set REDIS_URL or MEMCACHED_LOCATION."
+    )
+    if settings.DEBUG:
+        return [Warning(message, hint=hint + " A single runserver process can do without.", id="core.W001")]
+    return [Error(message, hint=hint, id="core.E001")]
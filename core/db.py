@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+REPLICA_ALIAS = "replica"
+
+# Catalog apps read from the replica; everything else stays on the primary.
+REPLICA_READ_APPS = {"products", "core"}
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS to every new SQLite connection (WAL, sync, mmap...)."""
+    if connection.vendor != "sqlite":
+        return
+
+    pragmas = dict(getattr(settings, "SQLITE_PRAGMAS", {}))
+    if connection.alias == REPLICA_ALIAS:
+        pragmas["query_only"] = "ON"
+
+    # Straight on the sqlite3 connection: part of opening it, not a query.
+    for name, value in pragmas.items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+class PrimaryReplicaRouter:
+    """
+    Send catalog reads to the read-only replica and all writes to the primary.
+
+    Reads made while the primary has a transaction open stay on the primary,
+    so `select_for_update()` in checkout and read-after-write inside the same
+    transaction always see current rows.
+    """
+
+    def _replica_available(self):
+        return REPLICA_ALIAS in settings.DATABASES
+
+    def db_for_read(self, model, **hints):
+        if not self._replica_available():
+            return None
+
+        if model._meta.app_label not in REPLICA_READ_APPS:
+            return "default"
+
+        if connections["default"].in_atomic_block:
+            return "default"
+
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
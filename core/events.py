@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger("core.events")
+
+_STOP = object()
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class EventLogger:
+    """
+    Structured events off the request path.
+
+    `emit()` only samples, rate-limits and puts the event on a bounded
+    queue; a daemon thread writes it to the `core.events` logger as one JSON
+    line and keeps the last EVENT_BUFFER_SIZE events in a ring buffer for
+    staff. When the queue is full the event is dropped and counted rather
+    than blocking the request.
+
+    The buffer and the drop count belong to the process: with several web
+    workers, `recent()` only shows the events this one handled. The log
+    is the complete record.
+    """
+
+    def __init__(self, *, queue_size: int, buffer_size: int, sampling: dict, rate_limits: dict):
+        self.sampling = dict(sampling)
+        self.rate_limits = dict(rate_limits)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.buffer: deque = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self._buckets: dict[str, _TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def emit(self, event: str, level: int = logging.INFO, **fields) -> None:
+        rate = self.sampling.get(event, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            return
+        if event in self.rate_limits and not self._allow(event):
+            return
+
+        self._ensure_worker()
+        record = {"ts": time.time(), "event": event, "level": logging.getLevelName(level), **fields}
+        try:
+            self.queue.put_nowait((level, record))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _allow(self, event: str) -> bool:
+        with self._lock:
+            bucket = self._buckets.get(event)
+            if bucket is None:
+                bucket = self._buckets[event] = _TokenBucket(self.rate_limits[event])
+            return bucket.take()
+
+    def _ensure_worker(self) -> None:
+        # A forked worker (gunicorn --preload) inherits the object but not the thread.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name="event-logger", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _STOP:
+                    return
+                level, record = item
+                with self._lock:
+                    self.buffer.append(record)
+                if logger.isEnabledFor(level):
+                    logger.log(level, json.dumps(record, default=str), extra={"event": record})
+            except Exception:
+                logger.exception("Could not write event")
+            finally:
+                self.queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued event has been handled."""
+        if self._pid == os.getpid():
+            self.queue.join()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._pid = None
+
+    def recent(self, limit: int | None = None, event: str | None = None) -> list[dict]:
+        """Newest first."""
+        with self._lock:
+            snapshot = list(self.buffer)
+        records = [record for record in reversed(snapshot) if event is None or record["event"] == event]
+        return records[:limit] if limit is not None else records
+
+
+_event_logger: EventLogger | None = None
+_setup_lock = threading.Lock()
+
+
+def get_event_logger() -> EventLogger:
+    global _event_logger
+    if _event_logger is None:
+        with _setup_lock:
+            if _event_logger is None:
+                _event_logger = EventLogger(
+                    queue_size=getattr(settings, "EVENT_QUEUE_SIZE", 10_000),
+                    buffer_size=getattr(settings, "EVENT_BUFFER_SIZE", 500),
+                    sampling=getattr(settings, "EVENT_SAMPLING", {}),
+                    rate_limits=getattr(settings, "EVENT_RATE_LIMITS", {}),
+                )
+                atexit.register(_event_logger.stop)
+    return _event_logger
+
+
+def emit(event: str, level: int = logging.INFO, **fields) -> None:
+    get_event_logger().emit(event, level, **fields)
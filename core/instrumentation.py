@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger("core.requests")
+
+_current_profile: ContextVar[RequestProfile | None] = ContextVar("request_profile", default=None)
+
+_THIS_FILE = str(Path(__file__).resolve())
+
+
+def _call_site() -> str:
+    """First frame in project code outside Django and this module, as `path:line in func`."""
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(base_dir)
+            and filename != _THIS_FILE
+            and "site-packages" not in filename
+        ):
+            relative = filename[len(base_dir):].lstrip("/\\")
+            return f"{relative}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+@dataclass(order=True)
+class QueryRecord:
+    duration: float
+    sql: str = field(compare=False)
+    alias: str = field(compare=False)
+    call_site: str = field(compare=False)
+
+
+@dataclass
+class RequestProfile:
+    """Queries, DB time and template time collected while profiling is active."""
+
+    keep_slowest: int = 3
+    keep_statements: bool = False
+    queries: int = 0
+    db_time: float = 0.0
+    template_time: float = 0.0
+    # Min-heap of the slowest statements; the call site is only resolved for
+    # statements that make it in.
+    slowest: list[QueryRecord] = field(default_factory=list)
+    statements: list[str] = field(default_factory=list)
+    _template_depth: int = 0
+
+    def record_query(self, sql: str, duration: float, alias: str) -> None:
+        self.queries += 1
+        self.db_time += duration
+        if self.keep_statements:
+            self.statements.append(sql)
+
+        if len(self.slowest) < self.keep_slowest:
+            heapq.heappush(self.slowest, QueryRecord(duration, sql, alias, _call_site()))
+        elif self.slowest and duration > self.slowest[0].duration:
+            heapq.heapreplace(self.slowest, QueryRecord(duration, sql, alias, _call_site()))
+
+    def slowest_first(self) -> list[QueryRecord]:
+        return sorted(self.slowest, reverse=True)
+
+    def server_timing(self, total: float) -> str:
+        entries = [
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"',
+            f"tpl;dur={self.template_time * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ]
+        for index, record in enumerate(self.slowest_first(), start=1):
+            site = record.call_site.replace('"', "'")
+            entries.append(f'sql-{index};dur={record.duration * 1000:.2f};desc="{site}"')
+        return ", ".join(entries)
+
+    def as_dict(self) -> dict:
+        return {
+            "queries": self.queries,
+            "db_ms": round(self.db_time * 1000, 2),
+            "template_ms": round(self.template_time * 1000, 2),
+            "slowest": [
+                {
+                    "ms": round(record.duration * 1000, 2),
+                    "alias": record.alias,
+                    "call_site": record.call_site,
+                    "sql": record.sql[:500],
+                }
+                for record in self.slowest_first()
+            ],
+        }
+
+
+class _QueryRecorder:
+    def __init__(self, profile: RequestProfile, alias: str):
+        self.profile = profile
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.profile.record_query(sql, time.perf_counter() - started, self.alias)
+
+
+@contextmanager
+def profiling(*, keep_slowest: int = 3, keep_statements: bool = False):
+    """Record every query on every connection (and template renders) inside the block."""
+    profile = RequestProfile(keep_slowest=keep_slowest, keep_statements=keep_statements)
+    token = _current_profile.set(profile)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(_QueryRecorder(profile, connection.alias))
+                )
+            yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current_profile.get()
+        if profile is None:
+            return super().render(context, request)
+
+        # Only the outermost render counts; nested ones are already inside it.
+        profile._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile._template_depth -= 1
+            if profile._template_depth == 0:
+                profile.template_time += time.perf_counter() - started
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates whose templates report their render time to the active profile."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
+
+
+class RequestProfileMiddleware:
+    """
+    Profile each request: query count, DB time, the slowest statements with
+    their call sites and template render time.
+
+    The numbers go out as a `Server-Timing` header (with DEBUG on or for
+    staff) and as one JSON log line on the `core.requests` logger, at
+    WARNING when the request went over QUERY_COUNT_WARNING queries.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "REQUEST_PROFILING", settings.DEBUG)
+        self.keep_slowest = getattr(settings, "REQUEST_PROFILE_SLOWEST", 3)
+        self.query_warning = getattr(settings, "QUERY_COUNT_WARNING", 50)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with profiling(keep_slowest=self.keep_slowest) as profile:
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        if self._expose_timing(request):
+            response["Server-Timing"] = profile.server_timing(total)
+
+        level = logging.WARNING if profile.queries > self.query_warning else logging.INFO
+        if logger.isEnabledFor(level):
+            payload = {
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "total_ms": round(total * 1000, 2),
+                **profile.as_dict(),
+            }
+            logger.log(level, json.dumps(payload), extra={"profile": payload})
+
+        return response
+
+    def _expose_timing(self, request) -> bool:
+        if settings.DEBUG:
+            return True
+        user = getattr(request, "user", None)
+        return user is not None and user.is_staff
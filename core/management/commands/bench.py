@@ -0,0 +1,413 @@
+import contextlib
+import json
+import logging
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client, RequestFactory
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils.text import slugify
+
+from cart.cart import Cart
+from cart.functions import sync_clear_cart
+from cart.models import CartItem, StockHold, UserCart
+from core.instrumentation import profiling
+from core.testing import private_cache
+from orders.models import Order, OrderAddress, OrderItem
+from orders.services import CustomerInfo, ShippingInfo, create_order_from_cart
+from products import search
+from products.management.commands.seed_products import (
+    CATEGORIES,
+    _make_svg_placeholder,
+    _random_product,
+)
+from products.models import Category, Product
+
+SCENARIOS = ("homepage", "listing", "detail", "cart_add", "cart_update", "sign_in", "checkout")
+
+SHOPPER_PREFIX = "bench-shopper-"
+SHOPPER_PASSWORD = "Bench!Pass1"
+
+# Every run starts from this stock so checkouts never drain the dataset.
+BENCH_STOCK = 10_000
+
+PLACEHOLDER_IMAGE = "Products_Images/bench-placeholder.svg"
+
+FAST_HASHERS = [
+    "django.contrib.auth.hashers.MD5PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+]
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(samples)))
+    return samples[min(rank, len(samples)) - 1]
+
+
+@contextlib.contextmanager
+def _silence_logger(name: str):
+    logger = logging.getLogger(name)
+    previous = logger.level
+    logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        logger.setLevel(previous)
+
+
+class _Worker:
+    """One simulated shopper: its own Client, user and random stream."""
+
+    def __init__(self, index: int, seed: int, product_ids: list[int], slugs: list[str],
+                 category_slugs: list[str]):
+        self.index = index
+        self.rng = random.Random(seed * 1000 + index)
+        self.product_ids = product_ids
+        self.slugs = slugs
+        self.category_slugs = category_slugs
+        self.username = f"{SHOPPER_PREFIX}{index}"
+        self.user = get_user_model().objects.get(username=self.username)
+        self.client = Client()
+        self.signed_in = Client()
+        self.signed_in.force_login(self.user)
+
+    def _check(self, response, *expected):
+        if response.status_code not in expected:
+            raise RuntimeError(f"{response.request['PATH_INFO']} returned {response.status_code}")
+
+    def homepage(self):
+        self._check(self.client.get(reverse("homepage")), 200)
+
+    def listing(self):
+        params = {}
+        if self.rng.random() < 0.5:
+            params["category"] = self.rng.choice(self.category_slugs)
+        self._check(self.client.get(reverse("products"), params), 200)
+
+    def detail(self):
+        slug = self.rng.choice(self.slugs)
+        self._check(self.client.get(reverse("product_details", args=[slug])), 200)
+
+    def cart_add(self):
+        product_id = self.rng.choice(self.product_ids)
+        self._check(self.client.post(reverse("cart_add", args=[product_id])), 302)
+
+    def prepare_cart_update(self):
+        self.update_ids = self.rng.sample(self.product_ids, min(5, len(self.product_ids)))
+        for product_id in self.update_ids:
+            self.client.post(reverse("cart_add", args=[product_id]))
+
+    def cart_update(self):
+        self.updated_id = self.rng.choice(self.update_ids)
+        self.update_action = self.rng.choice(("increase", "decrease"))
+        response = self.client.post(
+            reverse("cart_update", args=[self.updated_id]), {"action": self.update_action}
+        )
+        self._check(response, 302)
+
+    def after_cart_update(self):
+        if self.update_action == "decrease":
+            # Keep the line in the cart for the next update.
+            self.client.post(reverse("cart_add", args=[self.updated_id]))
+
+    def prepare_sign_in(self):
+        # A fresh visitor with one line in their guest cart, merged on sign-in.
+        self.visitor = Client()
+        self.visitor.post(reverse("cart_add", args=[self.rng.choice(self.product_ids)]))
+
+    def sign_in(self):
+        response = self.visitor.post(
+            reverse("sign_in"),
+            {"login-identifier": self.username, "password": SHOPPER_PASSWORD},
+        )
+        self._check(response, 302)
+        if response.url != reverse("homepage"):
+            raise RuntimeError("sign-in failed")
+
+    after_sign_in = prepare_sign_in
+
+    def prepare_checkout(self):
+        for product_id in self.rng.sample(self.product_ids, min(3, len(self.product_ids))):
+            self.signed_in.post(reverse("cart_add", args=[product_id]))
+
+    def checkout(self):
+        # There is no checkout view yet, so the flow calls the order service
+        # with the signed-in client's session, as a view would.
+        request = RequestFactory().post("/checkout/")
+        request.session = self.signed_in.session
+        request.user = self.user
+
+        create_order_from_cart(
+            user=self.user,
+            cart=Cart(request),
+            customer=CustomerInfo(full_name="Bench Shopper"),
+            shipping=ShippingInfo(address_line_1="1 Bench St", city="Tehran", postal_code="00000"),
+        )
+        sync_clear_cart(request)
+        request.session.save()
+
+    after_checkout = prepare_checkout
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed 1k/10k/100k product datasets and drive the storefront flows with "
+        "concurrent in-process clients; prints latency percentiles as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+        parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=400,
+                            help="Measured operations per scenario, split across clients.")
+        parser.add_argument("--warmup", type=int, default=5,
+                            help="Unmeasured operations per client before each scenario.")
+        parser.add_argument("--seed", type=int, default=11)
+        parser.add_argument("--db-dir", default=str(Path(tempfile.gettempdir()) / "olivegarden-bench"),
+                            help="Where the per-size bench databases are kept between runs.")
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument("--baseline", help="Compare against a report saved with --output.")
+        parser.add_argument("--tolerance", type=float, default=0.10,
+                            help="Allowed p95/throughput regression against the baseline (0.10 = 10%%).")
+        parser.add_argument("--real-hasher", action="store_true",
+                            help="Keep the production password hasher for sign-in.")
+
+    def handle(self, *args, **options):
+        db_dir = Path(options["db_dir"])
+        db_dir.mkdir(parents=True, exist_ok=True)
+
+        report = {
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "concurrency": options["concurrency"],
+                "requests_per_scenario": options["requests"],
+                "seed": options["seed"],
+                "real_hasher": options["real_hasher"],
+            },
+            "datasets": {},
+        }
+
+        hashers = {} if options["real_hasher"] else {"PASSWORD_HASHERS": FAST_HASHERS}
+        media_root = tempfile.mkdtemp(prefix="olivegarden-bench-media-")
+        setup_test_environment(debug=False)
+        try:
+            # Keep stray print()s from views out of the JSON on stdout, and
+            # per-request profile lines out of the way: the report has them.
+            # private_cache() and the temporary MEDIA_ROOT: the bench
+            # databases' product ids and files must not land in (or be read
+            # from) what a real server uses.
+            with override_settings(MEDIA_ROOT=media_root, **hashers), private_cache(), \
+                    contextlib.redirect_stdout(sys.stderr), _silence_logger("core.requests"):
+                for size in options["sizes"]:
+                    report["datasets"][str(size)] = self._run_size(size, db_dir, options)
+        finally:
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options["output"]:
+            Path(options["output"]).write_text(output + "\n")
+
+        if options["baseline"]:
+            self._compare(report, json.loads(Path(options["baseline"]).read_text()), options["tolerance"])
+
+    def _run_size(self, size: int, db_dir: Path, options) -> dict:
+        # A separate SQLite file per size, kept so the 100k seed is paid once.
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = str(db_dir / f"bench_{size}.sqlite3")
+        old_config = setup_databases(
+            verbosity=0, interactive=False, keepdb=True, serialized_aliases=set(),
+        )
+        try:
+            cache.clear()
+            self._seed(size, options["seed"])
+            self._reset_state(options["concurrency"])
+
+            product_ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+            slugs = list(Product.objects.order_by("id").values_list("slug", flat=True))
+            category_slugs = list(Category.objects.values_list("slug", flat=True))
+
+            workers = [
+                _Worker(i, options["seed"], product_ids, slugs, category_slugs)
+                for i in range(options["concurrency"])
+            ]
+            results = {}
+            for scenario in options["scenarios"]:
+                self.stderr.write(f"[{size}] {scenario}...")
+                results[scenario] = self._run_scenario(scenario, workers, options)
+            connections.close_all()
+            return results
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=True)
+
+    def _seed(self, size: int, seed: int) -> None:
+        # MEDIA_ROOT is a fresh temporary directory on every run (see handle)
+        # while the databases are kept, so this cannot wait for the seeding.
+        if not default_storage.exists(PLACEHOLDER_IMAGE):
+            default_storage.save(PLACEHOLDER_IMAGE, ContentFile(_make_svg_placeholder("OliveGarden", seed)))
+
+        existing = Product.objects.count()
+        if existing >= size:
+            return
+
+        self.stderr.write(f"Seeding {size - existing} products...")
+        category_map = {}
+        for name in CATEGORIES:
+            category_map[name], _ = Category.objects.get_or_create(
+                name=name, defaults={"slug": slugify(name)},
+            )
+
+        rng = random.Random(seed)
+        used_slugs = set(Product.objects.values_list("slug", flat=True))
+        batch_size = 5_000
+        for start in range(existing, size, batch_size):
+            products = []
+            for i in range(start, min(start + batch_size, size)):
+                product = _random_product(rng, i, category_map, used_slugs)
+                product.image.name = PLACEHOLDER_IMAGE
+                products.append(product)
+            with transaction.atomic():
+                Product.objects.bulk_create(products, batch_size=batch_size)
+
+        search.rebuild_index()
+
+    def _reset_state(self, concurrency: int) -> None:
+        """Put stock, shoppers, carts and orders back where every run starts."""
+        User = get_user_model()
+        password = make_password(SHOPPER_PASSWORD)
+        for i in range(concurrency):
+            user, _ = User.objects.get_or_create(username=f"{SHOPPER_PREFIX}{i}")
+            User.objects.filter(pk=user.pk).update(password=password)
+
+        shoppers = User.objects.filter(username__startswith=SHOPPER_PREFIX)
+        with transaction.atomic():
+            OrderItem.objects.filter(order__user__in=shoppers).delete()
+            OrderAddress.objects.filter(order__user__in=shoppers).delete()
+            Order.objects.filter(user__in=shoppers).delete()
+            CartItem.objects.filter(cart__user__in=shoppers).delete()
+            UserCart.objects.filter(user__in=shoppers).delete()
+            StockHold.objects.all().delete()
+            Product.objects.update(stock=BENCH_STOCK, held=0)
+
+    def _run_scenario(self, scenario: str, workers: list[_Worker], options) -> dict:
+        per_worker = max(1, options["requests"] // len(workers))
+        start_gate = threading.Barrier(len(workers))
+
+        def drive(worker: _Worker):
+            # prepare_<scenario> runs once, after_<scenario> after every
+            # operation; neither is timed.
+            prepare = getattr(worker, f"prepare_{scenario}", None)
+            operation = getattr(worker, scenario)
+            after = getattr(worker, f"after_{scenario}", None)
+            samples, queries, errors = [], 0, []
+            try:
+                try:
+                    if prepare is not None:
+                        prepare()
+                    for _ in range(options["warmup"]):
+                        operation()
+                        if after is not None:
+                            after()
+                except BaseException:
+                    start_gate.abort()
+                    raise
+
+                start_gate.wait()
+                for _ in range(per_worker):
+                    with profiling(keep_slowest=0) as profile:
+                        started = time.perf_counter()
+                        try:
+                            operation()
+                        except (ValidationError, RuntimeError) as exc:
+                            errors.append(str(exc))
+                        samples.append((time.perf_counter() - started) * 1000)
+                    queries += profile.queries
+                    if after is not None:
+                        after()
+            finally:
+                connections.close_all()
+            return samples, queries, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(workers)) as pool:
+            outcomes = list(pool.map(drive, workers))
+        wall = time.perf_counter() - started
+
+        samples = sorted(s for outcome in outcomes for s in outcome[0])
+        queries = sum(outcome[1] for outcome in outcomes)
+        errors = [e for outcome in outcomes for e in outcome[2]]
+        return {
+            "requests": len(samples),
+            "errors": len(errors),
+            "first_error": errors[0] if errors else None,
+            "throughput_rps": round(len(samples) / wall, 1) if wall else 0.0,
+            "mean_ms": round(statistics.fmean(samples), 2) if samples else 0.0,
+            "p50_ms": round(_percentile(samples, 50), 2),
+            "p95_ms": round(_percentile(samples, 95), 2),
+            "p99_ms": round(_percentile(samples, 99), 2),
+            "queries_per_request": round(queries / len(samples), 2) if samples else 0.0,
+        }
+
+    def _compare(self, report: dict, baseline: dict, tolerance: float) -> None:
+        regressions = []
+        for size, scenarios in report["datasets"].items():
+            for scenario, current in scenarios.items():
+                before = baseline.get("datasets", {}).get(size, {}).get(scenario)
+                if before is None:
+                    continue
+
+                p95_change = (current["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+                rps_change = (
+                    (current["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"]
+                    if before["throughput_rps"] else 0.0
+                )
+                line = (
+                    f"{size:>7} {scenario:<12} p95 {before['p95_ms']:>8.2f} -> {current['p95_ms']:>8.2f}ms "
+                    f"({p95_change:+.0%})  rps {before['throughput_rps']:>7.1f} -> "
+                    f"{current['throughput_rps']:>7.1f} ({rps_change:+.0%})  queries "
+                    f"{before['queries_per_request']} -> {current['queries_per_request']}"
+                )
+                regressed = (
+                    p95_change > tolerance
+                    or rps_change < -tolerance
+                    or current["queries_per_request"] > before["queries_per_request"]
+                )
+                if regressed:
+                    regressions.append(line)
+                    self.stderr.write(self.style.ERROR(line))
+                else:
+                    self.stderr.write(line)
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} scenario(s) regressed against the baseline.")
+        self.stderr.write(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,34 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db import REPLICA_ALIAS
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database onto the local read replica file."
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in connections.databases:
+            raise CommandError("No replica configured; set DB_REPLICA_PATH.")
+
+        primary = connections["default"]
+        if primary.vendor != "sqlite":
+            raise CommandError("sync_replica only handles SQLite files.")
+
+        # Release our own handle on the replica before overwriting it.
+        connections[REPLICA_ALIAS].close()
+
+        started = time.perf_counter()
+        primary.ensure_connection()
+        target = sqlite3.connect(connections.databases[REPLICA_ALIAS]["NAME"])
+        try:
+            primary.connection.backup(target, pages=4096)
+        finally:
+            target.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Replica refreshed in {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# How MEDIA_SERVE_MODE hands a checked file to the front server.
+ACCEL_REDIRECT = "x-accel-redirect"
+SENDFILE = "x-sendfile"
+
+
+def is_public(path: str) -> bool:
+    return path.startswith(tuple(getattr(settings, "MEDIA_PUBLIC_PREFIXES", ("Products_Images/",))))
+
+
+def can_access(request, path: str) -> bool:
+    """Catalog images are public; anything else under MEDIA_ROOT is staff-only."""
+    if is_public(path):
+        return True
+    user = getattr(request, "user", None)
+    return user is not None and user.is_staff
+
+
+def _etag(stat) -> str:
+    return quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+
+
+def _requested_range(request, size: int, etag: str, last_modified: int) -> tuple[int, int] | None:
+    """
+    The single `bytes=` range asked for, as (start, end) inclusive, or None
+    for the whole file. Multi-range requests and a stale If-Range get the
+    whole file; unsatisfiable ranges raise ValueError.
+    """
+    header = request.headers.get("Range", "").replace(" ", "")
+    match = _RANGE_RE.match(header)
+    if not match or not any(match.groups()):
+        return None
+
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # bytes=-N: the last N bytes.
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_range(handle, start: int, length: int, chunk_size: int = 64 * 1024):
+    with handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve(request, path):
+    """
+    Serve a file from MEDIA_ROOT after `can_access` allows it.
+
+    With MEDIA_SERVE_MODE set, Python only checks access and the front
+    server sends the bytes: `x-accel-redirect` (nginx, an internal location
+    at MEDIA_ACCEL_REDIRECT_PREFIX) or `x-sendfile` (Apache, lighttpd).
+    Otherwise the file goes out as a FileResponse, which WSGI servers can
+    hand to sendfile(), with ETag/Last-Modified revalidation and single
+    byte ranges.
+    """
+    path = posixpath.normpath(path).lstrip("/")
+    try:
+        fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404("Media file not found.")
+    if not can_access(request, path):
+        raise PermissionDenied
+    if not fullpath.is_file():
+        raise Http404("Media file not found.")
+
+    stat = fullpath.stat()
+    etag, last_modified = _etag(stat), int(stat.st_mtime)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        mode = getattr(settings, "MEDIA_SERVE_MODE", "")
+        # Percent-encoded: header values must be ASCII (Django would MIME-encode
+        # an upload named `گلدان.jpg`), and nginx and mod_xsendfile decode them.
+        if mode == ACCEL_REDIRECT:
+            response = HttpResponse(content_type=content_type)
+            prefix = getattr(settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+            response["X-Accel-Redirect"] = quote(prefix.rstrip("/") + "/" + path)
+        elif mode == SENDFILE:
+            response = HttpResponse(content_type=content_type)
+            response["X-Sendfile"] = quote(str(fullpath))
+        else:
+            response = _file_response(request, fullpath, stat, content_type, etag, last_modified)
+
+    response.headers.setdefault("ETag", etag)
+    response.headers.setdefault("Last-Modified", http_date(last_modified))
+    # Names can be reused (derivatives are rebuilt in place): cache for a
+    # while, then revalidate against the ETag.
+    patch_cache_control(
+        response,
+        **{"public" if is_public(path) else "private": True},
+        max_age=getattr(settings, "MEDIA_CACHE_MAX_AGE", 60 * 60 * 24),
+    )
+    return response
+
+
+def _file_response(request, fullpath: Path, stat, content_type: str, etag: str, last_modified: int):
+    try:
+        requested = _requested_range(request, stat.st_size, etag, last_modified)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+
+    if requested is None:
+        response = FileResponse(fullpath.open("rb"), content_type=content_type)
+    else:
+        start, end = requested
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(fullpath.open("rb"), start, length), content_type=content_type, status=206,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    return response
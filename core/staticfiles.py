@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import gzip
+import mimetypes
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written without it
+    brotli = None
+
+# Already compressed formats; a gzip/brotli copy would not be smaller.
+SKIP_COMPRESS_EXTENSIONS = {
+    ".br", ".gz", ".zip", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif",
+    ".ico", ".woff", ".woff2", ".mp4", ".webm", ".mp3", ".pdf",
+}
+
+# Variants we write, by the Content-Encoding they are served with.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0 keeps the output byte-identical between runs.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Content-hashed static files (`general.3f2a1c.css`), each with `.gz` and,
+    when the `brotli` package is installed, `.br` siblings written during
+    collectstatic.
+
+    Compression is incremental: a hashed name only ever holds one content,
+    so variants that already exist are kept and only new hashes are
+    compressed, on STATIC_COMPRESS_WORKERS threads.
+    """
+
+    # Smallest file worth compressing, and the saving a variant must make
+    # to be kept.
+    min_compress_size = 256
+    min_compress_ratio = 0.95
+
+    def stored_name(self, name):
+        # Without a manifest collectstatic has never run (a development
+        # checkout, the test suite): serve the plain names from the finders.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = []
+        for original_name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if isinstance(processed, Exception):
+                yield original_name, hashed_name, processed
+                continue
+            if hashed_name:
+                hashed_names.append(hashed_name)
+            yield original_name, hashed_name, processed
+
+        if dry_run:
+            return
+
+        workers = getattr(settings, "STATIC_COMPRESS_WORKERS", 4)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for name, written in zip(hashed_names, pool.map(self._compress, hashed_names)):
+                for variant in written:
+                    yield name, variant, True
+
+    def _compressors(self):
+        compressors = [(".gz", _gzip)]
+        if brotli is not None:
+            compressors.insert(0, (".br", _brotli))
+        return compressors
+
+    def _compress(self, name: str) -> list[str]:
+        """Write the missing variants of one hashed file; returns their names."""
+        if Path(name).suffix.lower() in SKIP_COMPRESS_EXTENSIONS:
+            return []
+
+        pending = [
+            (suffix, compress) for suffix, compress in self._compressors()
+            if not self.exists(name + suffix)
+        ]
+        if not pending:
+            return []
+
+        with self.open(name) as handle:
+            data = handle.read()
+        if len(data) < self.min_compress_size:
+            return []
+
+        written = []
+        for suffix, compress in pending:
+            compressed = compress(data)
+            if len(compressed) >= len(data) * self.min_compress_ratio:
+                continue
+            self._save(name + suffix, ContentFile(compressed))
+            written.append(name + suffix)
+        return written
+
+
+def _accepted_encodings(request) -> set[str]:
+    accepted = set()
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve(request, path):
+    """
+    Serve a collected file from STATIC_ROOT, picking its brotli or gzip
+    variant when the client takes it. Hashed names never change content,
+    so they are cached for a year as immutable; anything else revalidates.
+
+    Meant for deployments without a front server for static files
+    (SERVE_STATIC); nginx can do the same with `gzip_static`/`brotli_static`.
+    """
+    path = posixpath.normpath(path).lstrip("/")
+    try:
+        fullpath = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404("Static file not found.")
+    if not fullpath.is_file():
+        raise Http404("Static file not found.")
+
+    stat = fullpath.stat()
+    if not was_modified_since(request.headers.get("If-Modified-Since"), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    content_type, encoding = mimetypes.guess_type(str(fullpath))
+    served, content_encoding = fullpath, encoding
+    if encoding is None:
+        accepted = _accepted_encodings(request)
+        for coding, suffix in ENCODINGS:
+            variant = fullpath.with_name(fullpath.name + suffix)
+            if coding in accepted and variant.is_file():
+                served, content_encoding = variant, coding
+                break
+
+    response = FileResponse(
+        served.open("rb"),
+        filename=fullpath.name,
+        content_type=content_type or "application/octet-stream",
+    )
+    if content_encoding:
+        response.headers["Content-Encoding"] = content_encoding
+    response.headers["Last-Modified"] = http_date(stat.st_mtime)
+    patch_vary_headers(response, ("Accept-Encoding",))
+
+    if path in _hashed_names():
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers["Cache-Control"] = "public, max-age=0, must-revalidate"
+    return response
+
+
+@lru_cache(maxsize=1)
+def _hashed_names() -> frozenset[str]:
+    """Hashed names in the collectstatic manifest, read once per process."""
+    return frozenset(getattr(staticfiles_storage, "hashed_files", {}).values())
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import re
+from contextlib import ContextDecorator, ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from products.models import Category, Product
+from .checks import SHARED_CACHES
+from .instrumentation import RequestProfile, profiling
+
+# "SCAN products_product" is a full table scan; "SCAN ... USING INDEX",
+# "SEARCH ..." and virtual tables are not.
+_FULL_SCAN_RE = re.compile(r"^SCAN (\S+)$")
+
+_PLANNED_STATEMENTS = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+# Entry limit of private_cache() when standing in for Redis or Memcached.
+PRIVATE_CACHE_MAX_ENTRIES = 1_000_000
+
+
+def explain_query_plan(sql: str, params=()) -> list[str]:
+    """Detail lines of SQLite's EXPLAIN QUERY PLAN for one statement."""
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    return [line for line in plan if _FULL_SCAN_RE.match(line.strip())]
+
+
+class QueryPlanAssertions:
+    """TestCase mixin failing when a hot-path query falls back to a table scan."""
+
+    def assertNoFullScan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        plan = explain_query_plan(sql, params)
+        self.assertFalse(full_scans(plan), f"Full table scan in:\n{sql}\nPlan: {plan}")
+
+    @contextmanager
+    def assertNoFullScans(self):
+        """Explain every SELECT/UPDATE/DELETE run inside the block."""
+        with CaptureQueriesContext(connection) as captured:
+            yield captured
+
+        for query in captured.captured_queries:
+            sql = query["sql"]
+            if not sql.lstrip().upper().startswith(_PLANNED_STATEMENTS):
+                continue
+            plan = explain_query_plan(sql)
+            self.assertFalse(full_scans(plan), f"Full table scan in:\n{sql}\nPlan: {plan}")
+
+
+class assert_query_budget(ContextDecorator):
+    """
+    Fail if the block (or decorated test) runs more than `max_queries`
+    queries, or spends more than `max_db_ms` in the database when given.
+
+        with assert_query_budget(6):
+            self.client.get(reverse("products"))
+    """
+
+    def __init__(self, max_queries: int, *, max_db_ms: float | None = None):
+        self.max_queries = max_queries
+        self.max_db_ms = max_db_ms
+
+    def __enter__(self) -> RequestProfile:
+        self._profiling = profiling(keep_slowest=5, keep_statements=True)
+        self.profile = self._profiling.__enter__()
+        return self.profile
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profiling.__exit__(exc_type, exc, tb)
+        if exc_type is not None:
+            return False
+
+        profile = self.profile
+        if profile.queries > self.max_queries:
+            statements = "\n".join(
+                f"{index}. {sql}" for index, sql in enumerate(profile.statements, start=1)
+            )
+            raise AssertionError(
+                f"{profile.queries} queries run, budget is {self.max_queries}:\n{statements}"
+            )
+
+        db_ms = profile.db_time * 1000
+        if self.max_db_ms is not None and db_ms > self.max_db_ms:
+            slowest = "\n".join(
+                f"{record.duration * 1000:.2f}ms at {record.call_site}: {record.sql}"
+                for record in profile.slowest_first()
+            )
+            raise AssertionError(
+                f"{db_ms:.2f}ms spent in the database, budget is {self.max_db_ms}ms:\n{slowest}"
+            )
+        return False
+
+
+def create_category(name: str = "Pasta", slug: str = "pasta") -> Category:
+    return Category.objects.get_or_create(slug=slug, defaults={"name": name})[0]
+
+
+def create_product(
+    slug: str = "dish", *, name: str = "Dish", category: Category | None = None, **fields,
+) -> Product:
+    """A product in create_category() unless given one; `fields` override price 10, stock 5."""
+    return Product.objects.create(
+        slug=slug,
+        name=name,
+        category=category or create_category(),
+        **{"description": "Tasty", "price": 10, "stock": 5, **fields},
+    )
+
+
+def create_products(count: int, **fields) -> list[Product]:
+    """`count` products named "Dish 0", "Dish 1"... (slugs dish-0...), in one category."""
+    category = create_category()
+    return [
+        create_product(f"dish-{i}", name=f"Dish {i}", category=category, **fields)
+        for i in range(count)
+    ]
+
+
+@contextmanager
+def private_cache():
+    """
+    Swap the default cache for a throwaway in-process one. The configured
+    cache is shared with any server using the same Redis or Memcached; test
+    and bench runs must neither read its entries nor wipe them with
+    cache.clear(). Both run in one process, so core.E001 does not apply.
+
+    Size limits follow the configured cache so a benchmark culls no more
+    than the real one would; Redis and Memcached evict by memory, not by
+    entry count, so they get PRIVATE_CACHE_MAX_ENTRIES.
+    """
+    configured = settings.CACHES["default"]
+    if configured["BACKEND"] in SHARED_CACHES:
+        options = {"MAX_ENTRIES": PRIVATE_CACHE_MAX_ENTRIES}
+    else:
+        options = {
+            key: value
+            for key, value in configured.get("OPTIONS", {}).items()
+            if key in ("MAX_ENTRIES", "CULL_FREQUENCY")
+        }
+    private = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "private",
+        "OPTIONS": options,
+    }
+    if "TIMEOUT" in configured:
+        private["TIMEOUT"] = configured["TIMEOUT"]
+
+    with override_settings(
+        CACHES={"default": private},
+        SILENCED_SYSTEM_CHECKS=[*settings.SILENCED_SYSTEM_CHECKS, "core.E001", "core.W001"],
+    ):
+        yield
+
+
+class PrivateCacheTestRunner(DiscoverRunner):
+    """The stock runner, with the suite on a private_cache()."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_stack = ExitStack()
+        self._cache_stack.enter_context(private_cache())
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_stack.close()
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,223 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.functional import empty
+
+from . import checks, events, media, staticfiles
+from .testing import PRIVATE_CACHE_MAX_ENTRIES, private_cache
+
+
+class CompressedStaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(STATIC_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # The storage reads STATIC_ROOT and its manifest when first used.
+        self.addCleanup(setattr, staticfiles_storage, "_wrapped", empty)
+        self.addCleanup(staticfiles._hashed_names.cache_clear)
+
+    def _collect(self) -> dict:
+        staticfiles_storage._wrapped = empty
+        call_command("collectstatic", interactive=False, verbosity=0)
+        return {path: path.stat().st_mtime_ns for path in self.root.rglob("*.gz")}
+
+    def test_hashed_files_get_compressed_variants_once(self):
+        variants = self._collect()
+        hashed = staticfiles_storage.stored_name("js/wave.js")
+        self.assertNotEqual(hashed, "js/wave.js")
+        self.assertIn(self.root / f"{hashed}.gz", variants)
+
+        # Nothing changed: the existing variants are kept as they are.
+        self.assertEqual(self._collect(), variants)
+
+    def test_serve_picks_the_variant_and_caches_hashed_names(self):
+        self._collect()
+        hashed = staticfiles_storage.stored_name("js/wave.js")
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        response = staticfiles.serve(request, hashed)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Cache-Control"], staticfiles.IMMUTABLE_CACHE_CONTROL)
+        self.assertIn("Accept-Encoding", response["Vary"])
+        response.close()
+
+        response = staticfiles.serve(request, "js/wave.js")
+        self.assertNotIn("immutable", response["Cache-Control"])
+        response.close()
+
+
+@override_settings(MEDIA_SERVE_MODE="")
+class MediaServeTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        (self.root / "Products_Images").mkdir()
+        (self.root / "Products_Images" / "pot.jpg").write_bytes(bytes(range(256)) * 4)
+        (self.root / "exports").mkdir()
+        (self.root / "exports" / "orders.csv").write_text("id\n")
+
+    def _get(self, path, **headers):
+        return media.serve(RequestFactory().get("/", **headers), path)
+
+    def test_full_file_and_revalidation(self):
+        response = self._get("Products_Images/pot.jpg")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(256)) * 4)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("public", response["Cache-Control"])
+
+        self.assertEqual(self._get("Products_Images/pot.jpg", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_ranges(self):
+        response = self._get("Products_Images/pot.jpg", HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(10, 20)))
+
+        etag = response["ETag"]
+        response = self._get("Products_Images/pot.jpg", HTTP_RANGE="bytes=-4", HTTP_IF_RANGE=etag)
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(252, 256)))
+        response = self._get("Products_Images/pot.jpg", HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+        self.assertEqual(self._get("Products_Images/pot.jpg", HTTP_RANGE="bytes=2000-").status_code, 416)
+
+    def test_access_check_and_front_server_handoff(self):
+        with self.assertRaises(PermissionDenied):
+            self._get("exports/orders.csv")
+        with self.assertRaises(Http404):
+            self._get("../outside.txt")
+
+        with self.settings(MEDIA_SERVE_MODE=media.ACCEL_REDIRECT):
+            response = self._get("Products_Images/pot.jpg")
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/Products_Images/pot.jpg")
+        self.assertEqual(response.content, b"")
+
+        with self.settings(MEDIA_SERVE_MODE=media.SENDFILE):
+            response = self._get("Products_Images/pot.jpg")
+        self.assertEqual(response["X-Sendfile"], str(self.root / "Products_Images" / "pot.jpg"))
+
+    def test_handoff_percent_encodes_non_ascii_names(self):
+        (self.root / "Products_Images" / "گلدان_بزرگ.jpg").write_bytes(b"jpg")
+
+        with self.settings(MEDIA_SERVE_MODE=media.ACCEL_REDIRECT):
+            response = self._get("Products_Images/گلدان_بزرگ.jpg")
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-media/Products_Images/%DA%AF%D9%84%D8%AF%D8%A7%D9%86_%D8%A8%D8%B2%D8%B1%DA%AF.jpg",
+        )
+
+        with self.settings(MEDIA_SERVE_MODE=media.SENDFILE):
+            response = self._get("Products_Images/گلدان_بزرگ.jpg")
+        self.assertTrue(response["X-Sendfile"].isascii())
+        self.assertTrue(response["X-Sendfile"].endswith("/Products_Images/%DA%AF%D9%84%D8%AF%D8%A7%D9%86_%D8%A8%D8%B2%D8%B1%DA%AF.jpg"))
+
+
+class EventLoggerTests(TestCase):
+    def _logger(self, **options) -> events.EventLogger:
+        event_logger = events.EventLogger(
+            queue_size=options.get("queue_size", 100),
+            buffer_size=options.get("buffer_size", 10),
+            sampling=options.get("sampling", {}),
+            rate_limits=options.get("rate_limits", {}),
+        )
+        self.addCleanup(event_logger.stop)
+        return event_logger
+
+    def test_events_reach_the_ring_buffer(self):
+        event_logger = self._logger(buffer_size=3)
+        for quantity in range(5):
+            event_logger.emit("cart.add", product_id=1, quantity=quantity)
+        event_logger.flush()
+
+        recent = event_logger.recent()
+        self.assertEqual([record["quantity"] for record in recent], [4, 3, 2])
+        self.assertEqual(recent[0]["event"], "cart.add")
+
+    def test_recent_while_the_worker_appends(self):
+        event_logger = self._logger(queue_size=10_000, buffer_size=1_000)
+        for quantity in range(5_000):
+            event_logger.emit("cart.add", quantity=quantity)
+        while event_logger.queue.unfinished_tasks:
+            event_logger.recent(event="cart.add")
+        event_logger.flush()
+        self.assertEqual(len(event_logger.recent()), 1_000)
+
+    def test_sampling_and_rate_limits(self):
+        event_logger = self._logger(sampling={"cart.detail_viewed": 0.0}, rate_limits={"cart.add": 2})
+        for _ in range(5):
+            event_logger.emit("cart.detail_viewed")
+            event_logger.emit("cart.add")
+        event_logger.emit("cart.remove")
+        event_logger.flush()
+
+        self.assertEqual(len(event_logger.recent(event="cart.add")), 2)
+        self.assertEqual(event_logger.recent(event="cart.detail_viewed"), [])
+        self.assertEqual(len(event_logger.recent(event="cart.remove")), 1)
+
+    def test_recent_events_is_staff_only(self):
+        url = reverse("recent_events")
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        staff = get_user_model().objects.create_user(username="staff", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url, {"event": "cart.add"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("events", response.json())
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_only_redis_or_memcached_pass(self):
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://"}}
+        with self.settings(CACHES=redis):
+            self.assertEqual(checks.check_shared_cache(None), [])
+
+        files = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/tmp/c"}}
+        with self.settings(CACHES=files):
+            self.assertEqual([error.id for error in checks.check_shared_cache(None)], ["core.E001"])
+        with self.settings(CACHES=files, DEBUG=True):
+            self.assertEqual([error.id for error in checks.check_shared_cache(None)], ["core.W001"])
+
+        locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with self.settings(CACHES=locmem):
+            errors = checks.check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ["core.E001"])
+        self.assertIn("products.availability", errors[0].hint)
+        self.assertNotIn("CART_GUEST_STORAGE", errors[0].hint)
+
+        with self.settings(CACHES=locmem, CART_GUEST_STORAGE="cart.storage.CacheCartStorage"):
+            errors = checks.check_shared_cache(None)
+        self.assertIn("CART_GUEST_STORAGE", errors[0].hint)
+
+
+class PrivateCacheTests(SimpleTestCase):
+    def _private_options(self, configured):
+        with self.settings(CACHES={"default": configured}), private_cache():
+            return cache._max_entries, cache._cull_frequency, cache.default_timeout
+
+    def test_limits_follow_the_configured_cache(self):
+        locmem = {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "TIMEOUT": 60,
+            "OPTIONS": {"MAX_ENTRIES": 50_000, "CULL_FREQUENCY": 4},
+        }
+        self.assertEqual(self._private_options(locmem), (50_000, 4, 60))
+
+        redis = {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://"}
+        self.assertEqual(self._private_options(redis)[0], PRIVATE_CACHE_MAX_ENTRIES)
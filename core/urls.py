@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('', views.homepage, name='homepage'),
+    path('debug/events/', views.recent_events, name='recent_events'),
 ]
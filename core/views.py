@@ -1,7 +1,33 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from core.events import get_event_logger
+
+from products import availability
+from products.conditional import catalog_page, note_rendered
 from products.models import Product
 
+@catalog_page(lambda request: "homepage")
 def homepage(request):
-    featured_products = Product.objects.order_by("id")[:4]
+    featured_products = availability.attach(Product.objects.order_by("id")[:4])
+    note_rendered(request, ((product.pk, product.updated_at) for product in featured_products))
     return render(request, "components/homepage.html", {"featured_products": featured_products})
+
+
+@staff_member_required
+def recent_events(request):
+    """
+    The event logger's ring buffer, newest first; `?event=` filters by name.
+    The buffer is per process: behind several workers this is whichever one
+    answered, so use the `core.events` log for the full stream.
+    """
+    event_logger = get_event_logger()
+    try:
+        limit = int(request.GET.get("limit", 100))
+    except ValueError:
+        limit = 100
+    return JsonResponse({
+        "dropped": event_logger.dropped,
+        "events": event_logger.recent(limit, event=request.GET.get("event") or None),
+    })
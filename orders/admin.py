@@ -1,3 +1,57 @@
 from django.contrib import admin
+from django.db.models import Sum
 
-# Register your models here.
+from .models import DailyProductSales
+
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(admin.ModelAdmin):
+    """
+    Sales dashboard. Everything here, totals included, is read from the
+    summary table; the orders themselves are never scanned.
+    """
+    
+    change_list_template = "admin/orders/dailyproductsales/change_list.html"
+    
+    list_display = ("day", "product", "units", "revenue", "orders")
+    
+    list_select_related = ("product",)
+    
+    list_filter = ("day",)
+    
+    date_hierarchy = "day"
+    
+    search_fields = ("product__name",)
+    
+    ordering = ("-day", "-revenue")
+    
+    list_per_page = 50
+    
+    # Totals per day, shown above the rows; capped like a page of the list.
+    days_shown = 31
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        changelist = getattr(response, "context_data", {}).get("cl")
+        if changelist is None:
+            return response
+        
+        summary = changelist.queryset.order_by()
+        response.context_data["sales_totals"] = summary.aggregate(
+            units=Sum("units"), revenue=Sum("revenue"), orders=Sum("orders"),
+        )
+        response.context_data["sales_by_day"] = list(
+            summary.values("day")
+            .annotate(units=Sum("units"), revenue=Sum("revenue"))
+            .order_by("-day")[:self.days_shown]
+        )
+        return response
@@ -0,0 +1,74 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from cart.cart import Cart
+from orders.services import CustomerInfo, ShippingInfo, create_order_from_cart
+from products.models import Product
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _build_cart(products) -> Cart:
+    request = RequestFactory().get("/")
+    request.session = SessionStore()
+    cart = Cart(request)
+    for product in products:
+        cart.cart[str(product.id)] = 1
+    return cart
+
+
+class Command(BaseCommand):
+    help = "Measure query count and latency of create_order_from_cart by cart size."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10, 20, 50])
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        sizes = options["sizes"]
+        repeat = options["repeat"]
+
+        products = list(Product.objects.filter(stock__gte=repeat).order_by("id")[: max(sizes)])
+        if len(products) < max(sizes):
+            raise CommandError(
+                f"Need {max(sizes)} products with stock; run seed_products first."
+            )
+
+        user, _ = get_user_model().objects.get_or_create(
+            username="benchcheckout", defaults={"is_active": False}
+        )
+        customer = CustomerInfo(full_name="Bench Buyer")
+        shipping = ShippingInfo(address_line_1="1 Bench St", city="Tehran", postal_code="00000")
+
+        self.stdout.write(f"{'lines':>6}{'queries':>9}{'p50':>10}{'max':>10}")
+        for size in sizes:
+            samples = []
+            queries = 0
+            for _ in range(repeat):
+                cart = _build_cart(products[:size])
+                try:
+                    with transaction.atomic():
+                        with CaptureQueriesContext(connection) as captured:
+                            started = time.perf_counter()
+                            create_order_from_cart(
+                                user=user, cart=cart, customer=customer, shipping=shipping
+                            )
+                            samples.append((time.perf_counter() - started) * 1000)
+                        queries = len(captured)
+                        # Roll back so every run sees the same stock
+                        raise _Rollback
+                except _Rollback:
+                    pass
+
+            self.stdout.write(
+                f"{size:>6}{queries:>9}{statistics.median(samples):>8.2f}ms{max(samples):>8.2f}ms"
+            )
@@ -0,0 +1,126 @@
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test.utils import setup_databases, teardown_databases
+
+from orders.models import Order, OrderAddress, OrderItem
+from orders.services import CustomerInfo, ShippingInfo, create_order_from_cart
+from products.models import Category, Product
+from .bench_checkout import _build_cart
+
+STRATEGIES = ("locking", "conditional")
+
+
+class Command(BaseCommand):
+    help = (
+        "Many buyers checking out the same product at once: compare the "
+        "select_for_update and the conditional-UPDATE stock strategies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--attempts", type=int, default=25,
+                            help="Checkouts each buyer tries.")
+        parser.add_argument("--stock", type=int, default=200,
+                            help="Units of the hot product; fewer than threads x attempts sells out.")
+        parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+
+    def handle(self, *args, **options):
+        # A throwaway database: buyers have to commit for the locks to matter.
+        db_file = Path(tempfile.mkdtemp()) / "stock_contention.sqlite3"
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = str(db_file)
+        old_config = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+        try:
+            category = Category.objects.create(name="Flash Sale", slug="flash-sale")
+            product = Product.objects.create(
+                name="Flash Sale Pot", description="Limited run.", category=category,
+                price=Decimal("9.99"), stock=0, slug="flash-sale-pot",
+            )
+            User = get_user_model()
+            buyers = [
+                User.objects.create(username=f"flashbuyer{i}", is_active=False)
+                for i in range(options["threads"])
+            ]
+
+            self.stdout.write(
+                f"{'strategy':<12}{'sold':>6}{'sold out':>10}{'errors':>8}"
+                f"{'orders/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'stock':>7}  consistent"
+            )
+            for strategy in options["strategies"]:
+                Product.objects.filter(pk=product.pk).update(stock=options["stock"])
+                OrderItem.objects.all().delete()
+                OrderAddress.objects.all().delete()
+                Order.objects.all().delete()
+                self._report(strategy, self._run(strategy, product, buyers, options), options)
+        finally:
+            connections.close_all()
+            teardown_databases(old_config, verbosity=0)
+
+    def _run(self, strategy: str, product: Product, buyers, options) -> dict:
+        start_gate = threading.Barrier(len(buyers))
+        customer = CustomerInfo(full_name="Flash Buyer")
+        shipping = ShippingInfo(address_line_1="1 Sale St", city="Tehran", postal_code="00000")
+
+        def buy(buyer):
+            cart = _build_cart([product])
+            samples, sold, sold_out, errors = [], 0, 0, 0
+            try:
+                start_gate.wait()
+                for _ in range(options["attempts"]):
+                    started = time.perf_counter()
+                    try:
+                        create_order_from_cart(
+                            user=buyer, cart=cart, customer=customer, shipping=shipping,
+                            strategy=strategy,
+                        )
+                        sold += 1
+                    except ValidationError:
+                        sold_out += 1
+                    except OperationalError:
+                        errors += 1
+                    samples.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections.close_all()
+            return samples, sold, sold_out, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(buyers)) as pool:
+            outcomes = list(pool.map(buy, buyers))
+        elapsed = time.perf_counter() - started
+
+        samples = sorted(s for outcome in outcomes for s in outcome[0])
+        return {
+            "elapsed": elapsed,
+            "samples": samples,
+            "sold": sum(outcome[1] for outcome in outcomes),
+            "sold_out": sum(outcome[2] for outcome in outcomes),
+            "errors": sum(outcome[3] for outcome in outcomes),
+            "stock": Product.objects.values_list("stock", flat=True).get(pk=product.pk),
+            "ordered_units": OrderItem.objects.filter(product=product).count(),
+        }
+
+    def _report(self, strategy: str, result: dict, options) -> None:
+        samples = result["samples"]
+        p99 = samples[max(0, int(len(samples) * 0.99) - 1)] if samples else 0.0
+        # Every unit sold is an order line and nothing was sold twice.
+        consistent = (
+            result["sold"] == result["ordered_units"]
+            and result["stock"] == options["stock"] - result["sold"]
+            and result["stock"] >= 0
+        )
+        style = self.style.SUCCESS if consistent else self.style.ERROR
+        self.stdout.write(style(
+            f"{strategy:<12}{result['sold']:>6}{result['sold_out']:>10}{result['errors']:>8}"
+            f"{result['sold'] / result['elapsed']:>10.1f}"
+            f"{statistics.median(samples) if samples else 0.0:>9.2f}{p99:>9.2f}"
+            f"{result['stock']:>7}  {'yes' if consistent else 'NO'}"
+        ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.sales import rebuild_sales_summary
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily product sales summary from the paid orders, in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000,
+                            help="Orders aggregated per query.")
+
+    def handle(self, *args, **options):
+        verbosity = options["verbosity"]
+
+        def progress(counted):
+            if verbosity > 1:
+                self.stdout.write(f"orders={counted}")
+
+        started = time.perf_counter()
+        counted = rebuild_sales_summary(options["chunk_size"], on_chunk=progress)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the sales summary from {counted} paid orders in {elapsed:.2f}s."
+        ))
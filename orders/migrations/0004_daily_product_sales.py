@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:45
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_order_user_status_idx"),
+        ("products", "0006_product_held"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyProductSales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("units", models.IntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=14
+                    ),
+                ),
+                ("orders", models.IntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="daily_sales",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "daily product sales",
+                "verbose_name_plural": "daily product sales",
+                "indexes": [
+                    models.Index(
+                        fields=["product", "day"], name="daily_sales_product_day_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "product"), name="daily_sales_day_product_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -48,6 +48,12 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # A user's orders, optionally by status, newest first.
+            models.Index(fields=["user", "status", "-created_at"], name="order_user_status_idx"),
+        ]
+    
     def __str__(self):
         return f"Order #{self.id} ({self.status})"
 
@@ -98,3 +104,40 @@ class OrderItem(models.Model):
     
     def __str__(self):
         return f"{self.product_name} x {self.quantity}"
+
+
+class DailyProductSales(models.Model):
+    """
+    Paid sales of one product on one day (the day the order was placed).
+
+    Kept up to date by orders.services as orders are paid or cancelled and
+    recomputed from the orders by `manage.py rebuild_sales_summary`.
+    """
+    
+    day = models.DateField()
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.PROTECT,
+        related_name="daily_sales",
+    )
+    
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal("0.00"),
+    )
+    orders = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = "daily product sales"
+        verbose_name_plural = "daily product sales"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "product"], name="daily_sales_day_product_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["product", "day"], name="daily_sales_product_day_idx"),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} on {self.day}"
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyProductSales, Order, OrderItem
+
+
+@dataclass
+class SalesDelta:
+    units: int = 0
+    revenue: Decimal = Decimal("0.00")
+    orders: int = 0
+
+
+def order_sales(order: Order) -> dict[tuple[date, int], SalesDelta]:
+    """(day, product id) -> what this order adds to the summary once paid."""
+    day = timezone.localdate(order.created_at)
+    deltas: dict[tuple[date, int], SalesDelta] = {}
+    for product_id, quantity, price in order.items.values_list("product_id", "quantity", "product_price"):
+        delta = deltas.setdefault((day, product_id), SalesDelta(orders=1))
+        delta.units += quantity
+        delta.revenue += price * quantity
+    return deltas
+
+
+def apply_sales(deltas: dict[tuple[date, int], SalesDelta], sign: int = 1) -> None:
+    """
+    Add (or with `sign=-1` subtract) `deltas` to the summary rows.
+
+    Missing rows are inserted empty first (ignoring ones a concurrent writer
+    just created), then every row of a day moves in a single UPDATE of
+    `F()` increments, so concurrent payments never overwrite each other.
+    """
+    if not deltas:
+        return
+
+    DailyProductSales.objects.bulk_create(
+        [DailyProductSales(day=day, product_id=product_id) for day, product_id in deltas],
+        ignore_conflicts=True,
+    )
+
+    by_day: dict[date, dict[int, SalesDelta]] = {}
+    for (day, product_id), delta in deltas.items():
+        by_day.setdefault(day, {})[product_id] = delta
+
+    money = DecimalField(max_digits=14, decimal_places=2)
+    for day, products in by_day.items():
+        def increment(attr, output_field):
+            return Case(
+                *(
+                    When(product_id=product_id, then=Value(sign * getattr(delta, attr), output_field=output_field))
+                    for product_id, delta in products.items()
+                ),
+                default=Value(0, output_field=output_field),
+                output_field=output_field,
+            )
+
+        DailyProductSales.objects.filter(day=day, product_id__in=products).update(
+            units=F("units") + increment("units", IntegerField()),
+            revenue=F("revenue") + increment("revenue", money),
+            orders=F("orders") + increment("orders", IntegerField()),
+        )
+
+
+def record_paid(order: Order) -> None:
+    apply_sales(order_sales(order))
+
+
+def record_refunded(order: Order) -> None:
+    apply_sales(order_sales(order), sign=-1)
+
+
+def _chunk_sales(order_ids: Iterable[int]) -> dict[tuple[date, int], SalesDelta]:
+    rows = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .annotate(day=TruncDate("order__created_at"))
+        .values("day", "product_id")
+        .annotate(
+            line_units=Sum("quantity"),
+            line_revenue=Sum(
+                F("product_price") * F("quantity"),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+            line_orders=Count("order_id", distinct=True),
+        )
+        .order_by()
+    )
+    return {
+        (row["day"], row["product_id"]): SalesDelta(
+            units=row["line_units"],
+            revenue=Decimal(row["line_revenue"]).quantize(Decimal("0.01")),
+            orders=row["line_orders"],
+        )
+        for row in rows
+    }
+
+
+@transaction.atomic
+def rebuild_sales_summary(chunk_size: int = 1000, on_chunk=None) -> int:
+    """
+    Recompute the whole summary from the paid orders, `chunk_size` orders
+    at a time so the order history never has to fit in memory. Runs in one
+    transaction: readers keep seeing the old figures until it commits.
+    Returns the number of orders counted.
+    """
+    DailyProductSales.objects.all().delete()
+
+    paid = Order.objects.filter(status=Order.Status.PAID).order_by("pk").values_list("pk", flat=True)
+    last_pk, counted = 0, 0
+    while True:
+        order_ids = list(paid.filter(pk__gt=last_pk)[:chunk_size])
+        if not order_ids:
+            break
+
+        apply_sales(_chunk_sales(order_ids))
+        last_pk = order_ids[-1]
+        counted += len(order_ids)
+        if on_chunk is not None:
+            on_chunk(counted)
+
+    return counted
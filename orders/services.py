@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import random
+import time
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Iterable
+from typing import Callable, Iterable
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import transaction
-from django.db.models import F
+from django.db import OperationalError, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
 
 from products.models import Product
+from products import availability
 from cart.cart import Cart
+from cart.holds import drop_holds, owner_holds, user_hold_owner
 from .models import Order, OrderItem, OrderAddress
+from .sales import record_paid, record_refunded
 
 
 @dataclass(frozen=True)
@@ -29,23 +36,150 @@ class ShippingInfo:
     country: str = "Iran"
 
 def _iter_cart_lines(cart: Cart) -> Iterable[tuple[int, int]]:
-    for item in cart:
-        product = item.get("product")
-        qty = item.get("quantity")
-        
-        if not isinstance(product, Product):
-            raise ValidationError("Cart item has an invalid product.")
-        
-        if qty is None:
-            raise ValidationError("Cart item is missing quantity.")
-        
-        qty = int(qty)
-        if qty <=0:
+    snapshot = cart.snapshot()
+    if len(snapshot) != len(cart):
+        raise ValidationError("Cart item has an invalid product.")
+    
+    for line in snapshot:
+        if line.quantity <= 0:
             raise ValidationError("Cart contains an invalid quantity.")
         
-        yield product.id, qty
+        yield line.product.id, line.quantity
+
+class _StockShortfall(Exception):
+    """A conditional decrement matched fewer rows than the cart has lines."""
+
+
+def _merge_lines(lines: Iterable[tuple[int, int]]) -> dict[int, int]:
+    quantities: dict[int, int] = {}
+    for product_id, qty in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + qty
+    return quantities
+
+def _reserve_stock(quantities: dict[int, int], held: dict[int, int]) -> list[Product]:
+    """
+    Lock every product in the cart at once and take the stock in one UPDATE.
+    
+    Rows are locked in primary-key order so two checkouts sharing products
+    always queue in the same order instead of deadlocking. The UPDATE only
+    matches rows that still have enough stock, so its row count doubles as
+    the availability check.
+    """
+    product_ids = sorted(quantities)
+    products = list(
+        Product.objects.select_for_update()
+        .filter(pk__in=product_ids)
+        .order_by("pk")
+        .only("id", "name", "price", "stock", "held")
+    )
+    
+    if len(products) != len(product_ids):
+        raise ValidationError("Some products in your cart are no longer available.")
+    
+    for product in products:
+        available = product.available + held.get(product.id, 0)
+        if available < quantities[product.id]:
+            raise ValidationError(
+                f"Not enough stock for '{product.name}'. Available: {available}"
+            )
+    
+    if _decrement_stock(quantities, held) != len(product_ids):
+        raise ValidationError("Stock changed while placing your order. Please try again.")
+    
+    return products
+
+def _decrement_stock(quantities: dict[int, int], held: dict[int, int]) -> int:
+    """
+    Take every line in one conditional UPDATE and convert the buyer's holds.
+    
+    For a line of n units of which h are held by this buyer, the row only
+    matches while `stock - held >= n - h`, and then gets `stock = stock - n`
+    and `held = held - h`. Other carts' holds are never eaten into. Returns
+    the number of rows that matched.
+    """
+    enough_stock = Q()
+    for product_id, qty in quantities.items():
+        enough_stock |= Q(pk=product_id, stock__gte=F("held") - held.get(product_id, 0) + qty)
+    
+    changes = {
+        "stock": Case(
+            *(When(pk=product_id, then=F("stock") - qty) for product_id, qty in quantities.items()),
+            default=F("stock"),
+            output_field=IntegerField(),
+        ),
+    }
+    converted = {product_id: qty for product_id, qty in held.items() if qty and product_id in quantities}
+    if converted:
+        changes["held"] = Greatest(
+            Case(
+                *(When(pk=product_id, then=F("held") - qty) for product_id, qty in converted.items()),
+                default=F("held"),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+    
+    return Product.objects.filter(enough_stock).update(**changes)
+
+def _take_stock(quantities: dict[int, int], held: dict[int, int]) -> list[Product]:
+    """
+    Take the stock without locking anything first.
+    
+    The conditional UPDATE is the availability check: a row without enough
+    stock simply does not match, so no buyer ever waits on another buyer's
+    SELECT ... FOR UPDATE, only on the UPDATE itself. A short row count
+    raises _StockShortfall and the caller's transaction rolls the other
+    lines back.
+    """
+    product_ids = sorted(quantities)
+    
+    if _decrement_stock(quantities, held) != len(product_ids):
+        raise _StockShortfall
+    
+    return list(
+        Product.objects.filter(pk__in=product_ids)
+        .order_by("pk")
+        .only("id", "name", "price")
+    )
+
+def _shortfall_error(user, quantities: dict[int, int]) -> ValidationError:
+    """Explain a _StockShortfall from the stock as it is after the rollback."""
+    held = owner_holds(user_hold_owner(user.pk), quantities)
+    products = (
+        Product.objects.using("default")  # not the replica: this explains the primary's UPDATE
+        .filter(pk__in=quantities).order_by("pk").only("id", "name", "stock", "held")
+    )
+    found = 0
+    for product in products:
+        found += 1
+        available = product.available + held.get(product.id, 0)
+        if available < quantities[product.id]:
+            return ValidationError(
+                f"Not enough stock for '{product.name}'. Available: {available}"
+            )
+    
+    if found != len(quantities):
+        return ValidationError("Some products in your cart are no longer available.")
+    return ValidationError("Stock changed while placing your order. Please try again.")
+
+def _retry_transient(func: Callable[[], Order]) -> Order:
+    """
+    Run `func` (one whole transaction) again on lock timeouts / deadlocks.
+    
+    Only retried when we own the transaction: inside a caller's atomic block
+    the error is theirs to handle.
+    """
+    attempts = max(1, getattr(settings, "CHECKOUT_RETRY_ATTEMPTS", 3))
+    backoff = getattr(settings, "CHECKOUT_RETRY_BACKOFF_SECONDS", 0.05)
+    
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except OperationalError:
+            if attempt == attempts or transaction.get_connection().in_atomic_block:
+                raise
+            time.sleep(backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
 
-@transaction.atomic
 def create_order_from_cart(
     *,
     user,
@@ -53,12 +187,60 @@ def create_order_from_cart(
     customer: CustomerInfo,
     shipping: ShippingInfo,
     currency: str = "IRR",
+    strategy: str | None = None,
     ) -> Order:
+    """
+    Turn the cart into a pending order and take its stock.
     
-    lines = list(_iter_cart_lines(cart))
-    if not lines:
+    `strategy` (default CHECKOUT_STOCK_STRATEGY) picks how stock is taken:
+    "locking" locks the product rows with select_for_update first;
+    "conditional" decrements without row locks and retries on transient lock
+    errors.
+    """
+    quantities = _merge_lines(_iter_cart_lines(cart))
+    if not quantities:
         raise ValidationError("Your cart is empty.")
     
+    strategy = strategy or getattr(settings, "CHECKOUT_STOCK_STRATEGY", "locking")
+    if strategy == "locking":
+        return _place_order(user, quantities, customer, shipping, currency, _reserve_stock)
+    
+    if strategy != "conditional":
+        raise ValueError(f"Unknown checkout stock strategy: {strategy!r}")
+    
+    try:
+        return _retry_transient(
+            lambda: _place_order(user, quantities, customer, shipping, currency, _take_stock)
+        )
+    except _StockShortfall:
+        raise _shortfall_error(user, quantities) from None
+
+@transaction.atomic
+def _place_order(
+    user,
+    quantities: dict[int, int],
+    customer: CustomerInfo,
+    shipping: ShippingInfo,
+    currency: str,
+    take_stock: Callable[[dict[int, int], dict[int, int]], list[Product]],
+    ) -> Order:
+    
+    # Units this buyer already holds are converted rather than taken again.
+    owner = user_hold_owner(user.pk)
+    held = owner_holds(owner, quantities, lock=True)
+    products = take_stock(quantities, held)
+    if held:
+        drop_holds(owner, held)
+    # Held units were already counted as unavailable.
+    availability.adjust({
+        product_id: held.get(product_id, 0) - qty for product_id, qty in quantities.items()
+    })
+    
+    subtotal = sum(
+        (product.price * quantities[product.id] for product in products),
+        Decimal("0.00"),
+    )
+    
     order = Order.objects.create(
         user=user,
         status=Order.Status.PENDING,
@@ -66,10 +248,12 @@ def create_order_from_cart(
         phone_number=customer.phone_number.strip(),
         email=customer.email.strip(),
         currency=currency,
+        subtotal=subtotal,
+        total=subtotal,              # ! no shipping / discount / tax YET!
     )
     
     OrderAddress.objects.create(
-        order=Order,
+        order=order,
         address_line_1=shipping.address_line_1.strip(),
         address_line_2=shipping.address_line_2.strip(),
         city=shipping.city.strip(),
@@ -77,31 +261,16 @@ def create_order_from_cart(
         country=(shipping.country.strip() or "Iran"),
     )
     
-    subtotal = Decimal("0.00")
-    
-    for product_id, qty in lines:
-        product = Product.objects.select_for_update().get(pk=product_id)
-        
-        if product.stock < qty:
-            raise ValidationError(
-                f"Not enough stock for '{product.name}'. Available: {product.stock}"
-            )
-        
-        Product.objects.filter(pk=product_id).update(stock=F("stock") - qty)
-        
-        OrderItem.objects.create(
+    OrderItem.objects.bulk_create([
+        OrderItem(
             order=order,
             product=product,
             product_name=product.name,
             product_price=product.price,
-            quantity=qty,
+            quantity=quantities[product.id],
         )
-        
-        subtotal += product.price * qty
-    
-    order.subtotal = subtotal
-    order.total = subtotal              # ! no shipping / discount / tax YET!
-    order.save(update_fields=["subtotal", "total"])
+        for product in products
+    ])
     
     return order
 
@@ -113,6 +282,9 @@ def mark_order_paid(
     payment_reference: str = ""    
     ) -> Order:
     
+    # Re-read the status under the row lock so a double submit cannot count
+    # the same payment twice in the sales summary.
+    order.status = Order.objects.select_for_update().values_list("status", flat=True).get(pk=order.pk)
     if order.status != Order.Status.PENDING:
         raise ValidationError("Only pending orders can be marked as paid.")
     
@@ -120,16 +292,31 @@ def mark_order_paid(
     order.payment_reference = payment_reference.strip()
     order.save(update_fields=["status", "payment_reference", "updated_at"])
     
+    record_paid(order)
+    
     return order
 
 
 @transaction.atomic
 def mark_order_cancel(*, order: Order) -> Order:
-    if order.status != Order.Status.CANCELLED:
-        raise ValidationError("Only pending order can be cancelled.")
+    order.status = Order.objects.select_for_update().values_list("status", flat=True).get(pk=order.pk)
+    if order.status not in (Order.Status.PENDING, Order.Status.PAID):
+        raise ValidationError("Only pending or paid orders can be cancelled.")
+    
+    quantities = _merge_lines(order.items.values_list("product_id", "quantity"))
+    if quantities:
+        Product.objects.filter(pk__in=quantities).update(
+            stock=F("stock") + Case(
+                *(When(pk=product_id, then=Value(qty)) for product_id, qty in quantities.items()),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+        availability.adjust(quantities)
     
-    for item in order.items.all():
-        Product.objects.filter(pk=item.product_id).update(stock=F("stock") + item.quantity)
+    # Only paid orders were counted in the sales summary.
+    if order.status == Order.Status.PAID:
+        record_refunded(order)
     
     order.status = Order.Status.CANCELLED
     order.save(update_fields=["status", "updated_at"])
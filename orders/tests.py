@@ -1,3 +1,147 @@
-from django.test import TestCase
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import RequestFactory, TestCase
+
+from cart.cart import Cart
+from cart.holds import hold_line, user_hold_owner
+from cart.models import StockHold
+from core.testing import QueryPlanAssertions, create_product, create_products
+from products.models import Product
+from .models import DailyProductSales, Order
+from .sales import rebuild_sales_summary
+from .services import (
+    CustomerInfo,
+    ShippingInfo,
+    create_order_from_cart,
+    mark_order_cancel,
+    mark_order_paid,
+)
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite's")
+class CheckoutQueryPlanTests(QueryPlanAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(3)
+        cls.user = get_user_model().objects.create_user(username="buyer", password="pw")
+
+    def _cart(self) -> Cart:
+        request = RequestFactory().get("/")
+        request.session = SessionStore()
+        request.user = self.user
+        cart = Cart(request)
+        for product in self.products:
+            cart.cart[str(product.id)] = 2
+        return cart
+
+    def test_checkout(self):
+        with self.assertNoFullScans():
+            create_order_from_cart(
+                user=self.user,
+                cart=self._cart(),
+                customer=CustomerInfo(full_name="Buyer"),
+                shipping=ShippingInfo(address_line_1="1 Main St", city="Tehran", postal_code="1"),
+            )
+
+    def test_user_orders_by_status(self):
+        self.assertNoFullScan(
+            Order.objects.filter(user=self.user, status=Order.Status.PAID).order_by("-created_at")
+        )
+
+
+class CheckoutTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hot = create_product("hot", name="Hot Dish", stock=1)
+        cls.other = create_product("side", name="Side Dish", price=5)
+        cls.user = get_user_model().objects.create_user(username="buyer", password="pw")
+
+    def _checkout(self, strategy, quantities):
+        request = RequestFactory().get("/")
+        request.session = SessionStore()
+        request.user = self.user
+        cart = Cart(request)
+        for product, quantity in quantities.items():
+            cart.cart[str(product.id)] = quantity
+        return create_order_from_cart(
+            user=self.user,
+            cart=cart,
+            customer=CustomerInfo(full_name="Buyer"),
+            shipping=ShippingInfo(address_line_1="1 Main St", city="Tehran", postal_code="1"),
+            strategy=strategy,
+        )
+
+
+class StockStrategyTests(CheckoutTestCase):
+    def test_shortfall_rolls_back_every_line(self):
+        for strategy in ("conditional", "locking"):
+            with self.subTest(strategy=strategy):
+                with self.assertRaisesMessage(ValidationError, "Not enough stock for 'Hot Dish'"):
+                    self._checkout(strategy, {self.other: 2, self.hot: 2})
+                self.assertEqual(Product.objects.get(pk=self.other.pk).stock, 5)
+                self.assertFalse(Order.objects.exists())
+
+    def test_conditional_takes_stock(self):
+        order = self._checkout("conditional", {self.other: 2, self.hot: 1})
+        self.assertEqual(order.total, 20)
+        self.assertEqual(Product.objects.get(pk=self.hot.pk).stock, 0)
+        self.assertEqual(Product.objects.get(pk=self.other.pk).stock, 3)
+
+    def test_holds_become_stock_decrements(self):
+        owner = user_hold_owner(self.user.pk)
+        for strategy in ("conditional", "locking"):
+            with self.subTest(strategy=strategy):
+                hold_line(owner, self.other.pk, 2)
+                self._checkout(strategy, {self.other: 3})
+                other = Product.objects.get(pk=self.other.pk)
+                self.assertEqual((other.stock, other.held), (2, 0))
+                self.assertFalse(StockHold.objects.filter(owner=owner).exists())
+                Product.objects.filter(pk=self.other.pk).update(stock=5)
+
+    def test_held_units_are_reserved_for_their_owner(self):
+        hold_line("guest:someone", self.hot.pk, 1)
+        with self.assertRaisesMessage(ValidationError, "Not enough stock for 'Hot Dish'"):
+            self._checkout("conditional", {self.hot: 1})
+
+        hold_line(user_hold_owner(self.user.pk), self.other.pk, 2)
+        self._checkout("locking", {self.other: 2})
+        self.assertEqual(Product.objects.get(pk=self.other.pk).stock, 3)
+
+
+class SalesSummaryTests(CheckoutTestCase):
+    def _summary(self):
+        return {
+            row.product_id: (row.units, row.revenue, row.orders)
+            for row in DailyProductSales.objects.all()
+        }
+
+    def test_paid_and_cancelled_orders(self):
+        first = self._checkout("conditional", {self.other: 2, self.hot: 1})
+        second = self._checkout("conditional", {self.other: 1})
+        self.assertEqual(self._summary(), {})
+
+        mark_order_paid(order=first)
+        mark_order_paid(order=second)
+        self.assertEqual(self._summary(), {self.other.pk: (3, 15, 2), self.hot.pk: (1, 10, 1)})
+        with self.assertRaises(ValidationError):
+            mark_order_paid(order=first)
+
+        mark_order_cancel(order=first)
+        self.assertEqual(self._summary(), {self.other.pk: (1, 5, 1), self.hot.pk: (0, 0, 0)})
+        self.assertEqual(Product.objects.get(pk=self.hot.pk).stock, 1)
+        self.assertEqual(Product.objects.get(pk=self.other.pk).stock, 4)
+        with self.assertRaises(ValidationError):
+            mark_order_cancel(order=first)
+
+    def test_rebuild_matches_incremental(self):
+        for quantities in ({self.other: 2, self.hot: 1}, {self.other: 1}, {self.other: 1}):
+            mark_order_paid(order=self._checkout("conditional", quantities))
+        self._checkout("conditional", {self.other: 1})
+        incremental = self._summary()
+
+        self.assertEqual(rebuild_sales_summary(chunk_size=2), 3)
+        self.assertEqual(self._summary(), incremental)
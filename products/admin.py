@@ -1,5 +1,7 @@
 from django.contrib import admin
+from django.db.models.expressions import RawSQL
 from .models import Product, ProductImage
+from .search import SEARCH_TABLE, build_match_query, search_available
 
 
 class ProductImageInline(admin.TabularInline):
@@ -19,7 +21,7 @@ class ProductAdmin(admin.ModelAdmin):
     
     prepopulated_fields = {'slug': ('name', 'category')}
     
-    list_display = ('id', 'name', 'price', 'stock', 'category')
+    list_display = ('id', 'name', 'price', 'stock', 'held', 'category')
     
     list_select_related = ("category",)
     
@@ -29,10 +31,21 @@ class ProductAdmin(admin.ModelAdmin):
     
     list_filter = ('created_at', 'updated_at', 'price')
     
-    search_fields = ('name', 'description', 'category')
+    search_fields = ('name', 'description', 'category__name')
     
     ordering = ('-created_at', 'price', 'name')
     
     list_per_page = 25
     
     inlines = [ProductImageInline]
+    
+    def get_search_results(self, request, queryset, search_term):
+        match = build_match_query(search_term)
+        if match is None or not search_available():
+            return super().get_search_results(request, queryset, search_term)
+        
+        # Let FTS5 pick the ids instead of LIKE %term% over three columns.
+        matching_ids = RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [match]
+        )
+        return queryset.filter(pk__in=matching_ids), False
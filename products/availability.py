@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Product
+
+# Units available to add to a cart (stock - held) per product. The database
+# stays authoritative: holds and checkout take stock with conditional
+# UPDATEs, then move the cached count by the same amount once they commit.
+# Missing counts are loaded from the database; drifted ones (a missed
+# adjustment, a racing refill) are fixed by the timeout or by
+# `manage.py reconcile_availability`. Every process must see the same cache
+# and move a count atomically: Redis or Memcached (enforced by core.checks).
+_KEY = "availability:{}"
+
+
+def _timeout() -> int:
+    return getattr(settings, "AVAILABILITY_CACHE_TIMEOUT", 60 * 15)
+
+
+def get_many(product_ids: Iterable[int]) -> dict[int, int]:
+    """Product id -> available units; misses are loaded in one query."""
+    keys = {_KEY.format(pk): pk for pk in product_ids}
+    if not keys:
+        return {}
+
+    counts = {keys[key]: max(value, 0) for key, value in cache.get_many(list(keys)).items()}
+    missing = [pk for pk in keys.values() if pk not in counts]
+    if missing:
+        # The primary: a replica's stale count would be cached for the timeout.
+        rows = Product.objects.using("default").filter(pk__in=missing).values_list("pk", "stock", "held")
+        loaded = {pk: max(stock - held, 0) for pk, stock, held in rows}
+        _fill(loaded)
+        counts.update(loaded)
+    return counts
+
+
+def get(product_id: int) -> int:
+    return get_many([product_id]).get(product_id, 0)
+
+
+def attach(products) -> list:
+    """
+    Set `available` on already loaded products from the cache. Rows the
+    cache does not know yet seed it with their own stock and held columns,
+    so this does not query; rows read from the replica are not trusted for
+    that and their counts are loaded from the primary instead.
+    """
+    products = list(products)
+    cached = cache.get_many([_KEY.format(product.pk) for product in products])
+    seeds, unknown = {}, []
+    for product in products:
+        value = cached.get(_KEY.format(product.pk))
+        if value is not None:
+            product.available = max(value, 0)
+        elif product._state.db == "default":
+            seeds[product.pk] = product.available
+        else:
+            unknown.append(product)
+    _fill(seeds)
+
+    if unknown:
+        counts = get_many(product.pk for product in unknown)
+        for product in unknown:
+            product.available = counts.get(product.pk, 0)
+    return products
+
+
+def _fill(counts: dict[int, int]) -> None:
+    # add(), not set(): a count adjusted since our read is newer than ours.
+    for pk, count in counts.items():
+        cache.add(_KEY.format(pk), count, _timeout())
+
+
+def adjust(deltas: dict[int, int]) -> None:
+    """
+    Move cached counts by `deltas` (product id -> units, negative to take)
+    once the current transaction commits. Counts that are not cached are
+    left alone; the next read loads them.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: _apply(deltas))
+
+
+def _apply(deltas: dict[int, int]) -> None:
+    # Catalog pages fold the counts of their own products into their ETags
+    # (products.conditional); nothing else needs to move.
+    for pk, delta in deltas.items():
+        try:
+            if delta > 0:
+                cache.incr(_KEY.format(pk), delta)
+            else:
+                cache.decr(_KEY.format(pk), -delta)
+        except ValueError:
+            pass
+
+
+def forget(product_ids: Iterable[int]) -> None:
+    cache.delete_many([_KEY.format(pk) for pk in product_ids])
+
+
+def reconcile(batch_size: int = 1000) -> int:
+    """Overwrite every cached count with the database's; returns products checked."""
+    rows = Product.objects.using("default").order_by("pk").values_list("pk", "stock", "held")
+    last_pk, checked = 0, 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return checked
+
+        cache.set_many(
+            {_KEY.format(pk): max(stock - held, 0) for pk, stock, held in batch},
+            _timeout(),
+        )
+        last_pk = batch[-1][0]
+        checked += len(batch)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+from functools import wraps
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from cart.storage import get_cart_storage
+from . import availability
+from .page_cache import catalog_generation
+
+_VALIDATORS_KEY = "catalog_page:{}:{}"
+
+# Request attribute holding {product id: updated_at} of what a catalog view
+# rendered.
+RENDERED_ATTR = "_catalog_rendered"
+
+
+def note_rendered(request, products: Iterable[tuple[int, datetime]]) -> None:
+    """Record the (id, updated_at) of the products the view rendered, for its validators."""
+    rendered = getattr(request, RENDERED_ATTR, None)
+    if rendered is None:
+        rendered = {}
+        setattr(request, RENDERED_ATTR, rendered)
+    rendered.update(products)
+
+
+def _variant(request) -> str:
+    """
+    The per-visitor part of the page: the header (who is signed in, cart
+    badge), the CSRF secret behind the tokens in its forms and any flash
+    messages waiting to be shown.
+    """
+    user = request.user
+    who = f"user:{user.pk}:{user.first_name}" if user.is_authenticated else "anon"
+    return "|".join((
+        who,
+        f"cart:{get_cart_storage(request).count()}",
+        f"csrf:{request.META.get('CSRF_COOKIE', '')}",
+        f"messages:{_pending_messages(request)}",
+    ))
+
+
+def _pending_messages(request) -> int:
+    return len(get_messages(request))
+
+
+def _validators(page_key: str, generation: int, last_modified: datetime, product_ids, variant: str):
+    # Stock moves do not touch `updated_at`; the counts of exactly the
+    # products on the page go into the ETag instead, so a sale elsewhere
+    # leaves this page's validators alone.
+    counts = availability.get_many(product_ids)
+    shown = ",".join(f"{pk}:{counts.get(pk, 0)}" for pk in product_ids)
+    digest = hashlib.blake2b(
+        f"{page_key}|{generation}|{last_modified.isoformat()}|{shown}|{variant}".encode(),
+        digest_size=16,
+    ).hexdigest()
+    return quote_etag(digest), int(last_modified.timestamp())
+
+
+def _is_shared(request) -> bool:
+    """Whether the visitor sees the plain page: signed out, empty cart."""
+    return not request.user.is_authenticated and not get_cart_storage(request).count()
+
+
+def _set_validators(response, etag: str, last_modified: int, shared: bool) -> None:
+    response.headers.setdefault("ETag", etag)
+    # Last-Modified cannot tell visitors apart; only the plain page gets
+    # one, everyone else revalidates with the ETag.
+    if shared:
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+    patch_vary_headers(response, ("Cookie",))
+    patch_cache_control(response, private=True, no_cache=True)
+
+
+def catalog_page(page_key):
+    """
+    Conditional GET for a catalog view.
+
+    After a full render the products the view rendered (see note_rendered)
+    are cached against the page key and the current catalog generation. A
+    later request whose If-None-Match still matches is answered 304 from
+    that entry and the products' cached availability, without running the
+    view. If-Modified-Since alone never gets a 304: availability moves
+    without changing a timestamp. `page_key` is called with the view's
+    arguments and names the page's content, e.g. the listing's category
+    and cursor.
+
+    Requests with flash messages waiting always run the view, which shows
+    (and consumes) them.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            key = page_key(request, *args, **kwargs)
+            generation = catalog_generation()
+            cache_key = _VALIDATORS_KEY.format(generation, key)
+            cached = cache.get(cache_key)
+            if cached is not None and not _pending_messages(request):
+                last_modified, product_ids = cached
+                etag, changed_at = _validators(key, generation, last_modified, product_ids, _variant(request))
+                response = get_conditional_response(request, etag=etag)
+                if response is not None:
+                    _set_validators(response, etag, changed_at, _is_shared(request))
+                    return response
+
+            response = view(request, *args, **kwargs)
+
+            rendered = getattr(request, RENDERED_ATTR, None)
+            if response.status_code == 200 and rendered:
+                last_modified, product_ids = max(rendered.values()), tuple(sorted(rendered))
+                cache.set(
+                    cache_key, (last_modified, product_ids),
+                    getattr(settings, "PRODUCT_DETAIL_CACHE_TIMEOUT", 60 * 60),
+                )
+                # After the render: it may have just issued the CSRF cookie.
+                etag, changed_at = _validators(key, generation, last_modified, product_ids, _variant(request))
+                _set_validators(response, etag, changed_at, _is_shared(request))
+            return response
+        return wrapper
+    return decorator
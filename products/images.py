@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import PurePosixPath, Path
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_WIDTHS = (320, 640, 1024)
+
+# Extension -> Pillow format name. WebP first: it is what <picture> offers first.
+DERIVATIVE_FORMATS = {
+    "webp": "WEBP",
+    "jpg": "JPEG",
+}
+
+DERIVATIVE_QUALITY = 80
+
+DERIVATIVES_DIR = "derivatives"
+
+RASTER_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+
+_DERIVATIVES_KEY = "image_derivatives:{}"
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def derivative_name(name: str, width: int, ext: str) -> str:
+    """Storage name of one derivative: `<dir>/derivatives/<stem>-<width>w.<ext>`."""
+    path = PurePosixPath(name)
+    return str(path.parent / DERIVATIVES_DIR / f"{path.stem}-{width}w.{ext}")
+
+
+def is_raster(name: str) -> bool:
+    return PurePosixPath(name).suffix.lower() in RASTER_EXTS
+
+
+def build_derivatives(name: str, media_root: str, force: bool = False) -> list[str]:
+    """
+    Write every width/format derivative of the media file `name`.
+
+    Runs inside pool workers, so it only touches the filesystem and takes
+    plain strings; widths larger than the source are skipped rather than
+    upscaled.
+    """
+    root = Path(media_root)
+    source = root / name
+    written = []
+
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA" if "A" in original.getbands() else "RGB")
+
+        for width in DERIVATIVE_WIDTHS:
+            if width > original.width:
+                continue
+
+            height = max(1, round(original.height * width / original.width))
+            resized = None
+
+            for ext, pil_format in DERIVATIVE_FORMATS.items():
+                target_name = derivative_name(name, width, ext)
+                target = root / target_name
+                if not force and target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+                    continue
+
+                if resized is None:
+                    resized = original.resize((width, height), Image.Resampling.LANCZOS)
+
+                image = resized
+                if pil_format == "JPEG" and image.mode == "RGBA":
+                    image = image.convert("RGB")
+
+                target.parent.mkdir(parents=True, exist_ok=True)
+                image.save(target, pil_format, quality=DERIVATIVE_QUALITY, optimize=True)
+                written.append(target_name)
+
+    return written
+
+
+def _build_logged(name: str, media_root: str, force: bool = False) -> list[str]:
+    try:
+        return build_derivatives(name, media_root, force)
+    except Exception:
+        logger.exception("Could not build image derivatives for %s", name)
+        return []
+
+
+def _built(name: str, on_done=None) -> None:
+    forget_derivatives(name)
+    if on_done is not None:
+        on_done()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, "IMAGE_DERIVATIVE_WORKERS", 2)
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+    return _executor
+
+
+def schedule_derivatives(name: str, on_done=None) -> None:
+    """
+    Queue derivative generation for a freshly saved upload on the process pool.
+
+    `on_done` runs in this process once the derivatives exist, e.g. to drop
+    cached pages that were rendered without them.
+    """
+    if not name or not is_raster(name):
+        return
+
+    if not getattr(settings, "IMAGE_DERIVATIVES_ASYNC", True):
+        _build_logged(name, str(settings.MEDIA_ROOT))
+        _built(name, on_done)
+        return
+
+    future = _get_executor().submit(_build_logged, name, str(settings.MEDIA_ROOT))
+    future.add_done_callback(lambda _: _built(name, on_done))
+
+
+def _derivatives_key(name: str) -> str:
+    # Upload names can hold spaces and non-ASCII, which Memcached keys cannot.
+    return _DERIVATIVES_KEY.format(hashlib.blake2b(name.encode(), digest_size=16).hexdigest())
+
+
+def existing_derivatives(name: str) -> dict[str, list[tuple[str, int]]]:
+    """
+    Extension -> (storage name, width) of the derivatives of `name` that
+    exist. Storage is checked once; the answer is cached until
+    forget_derivatives() (called whenever they are built) or
+    IMAGE_DERIVATIVES_CACHE_TIMEOUT.
+    """
+    if not name or not is_raster(name):
+        return {}
+
+    key = _derivatives_key(name)
+    found = cache.get(key)
+    if found is None:
+        found = {}
+        for ext in DERIVATIVE_FORMATS:
+            targets = [(derivative_name(name, width, ext), width) for width in DERIVATIVE_WIDTHS]
+            found[ext] = [(target, width) for target, width in targets if default_storage.exists(target)]
+        cache.set(key, found, getattr(settings, "IMAGE_DERIVATIVES_CACHE_TIMEOUT", 60 * 60 * 24))
+    return found
+
+
+def forget_derivatives(name: str) -> None:
+    cache.delete(_derivatives_key(name))
+
+
+def srcset_candidates(name: str, ext: str) -> list[tuple[str, int]]:
+    """(url, width) pairs for the derivatives of `name` that exist on disk."""
+    return [
+        (default_storage.url(target), width)
+        for target, width in existing_derivatives(name).get(ext, [])
+    ]
@@ -0,0 +1,90 @@
+import statistics
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from products import search
+from products.models import Product
+from products.management.commands.seed_products import ADJECTIVES, CATEGORIES, POT_TYPES
+
+
+DEFAULT_QUERIES = [
+    "ceramic",
+    "matte cylinder",
+    "hanging planter",
+    "drainage saucer",
+    "terracotta herb",
+    "self watering",
+    "rattan basket",
+    "textured stone",
+]
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Compare FTS5 search latency against the icontains fallback."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000,
+                            help="Seed up to this many products before measuring.")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--page-size", type=int, default=24)
+        parser.add_argument("--query", action="append", dest="queries",
+                            help="Query to run (repeatable). Defaults to seed vocabulary.")
+
+    def _time(self, fn, query: str, repeat: int) -> list[float]:
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn(query)
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    def handle(self, *args, **options):
+        target = options["products"]
+        repeat = options["repeat"]
+        page_size = options["page_size"]
+        queries = options["queries"] or DEFAULT_QUERIES
+
+        existing = Product.objects.count()
+        if existing < target:
+            self.stdout.write(f"Seeding {target - existing} products...")
+            # Bulk mode: bulk_create in chunks and one index rebuild, instead of
+            # a save (and its cache-invalidating signals) per row.
+            call_command("seed_products", count=target - existing, batch_size=2_000, progress_every=0)
+
+        if not search.search_available():
+            self.stdout.write(self.style.WARNING("FTS5 unavailable; only the fallback can run."))
+            return
+
+        def fts(query):
+            ids = search._ranked_ids(search.build_match_query(query), page_size, 0)
+            return list(Product.objects.in_bulk(ids))
+
+        def icontains(query):
+            ids = search._fallback_ids(query, page_size, 0)
+            return list(Product.objects.in_bulk(ids))
+
+        vocabulary = len(ADJECTIVES) + len(POT_TYPES) + len(CATEGORIES)
+        self.stdout.write(
+            f"{Product.objects.count()} products, {len(queries)} queries "
+            f"(seed vocabulary: {vocabulary} terms), {repeat} runs each\n"
+        )
+        self.stdout.write(f"{'query':<22}{'fts p50':>10}{'fts p95':>10}{'like p50':>11}{'like p95':>11}{'speed-up':>10}")
+
+        for query in queries:
+            fts_samples = self._time(fts, query, repeat)
+            like_samples = self._time(icontains, query, repeat)
+            fts_p50 = statistics.median(fts_samples)
+            like_p50 = statistics.median(like_samples)
+            self.stdout.write(
+                f"{query:<22}{fts_p50:>9.2f}ms{_percentile(fts_samples, 95):>8.2f}ms"
+                f"{like_p50:>9.2f}ms{_percentile(like_samples, 95):>9.2f}ms"
+                f"{like_p50 / fts_p50 if fts_p50 else 0:>9.1f}x"
+            )
@@ -0,0 +1,63 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from products.images import build_derivatives, forget_derivatives, is_raster
+from products.models import Product, ProductImage
+
+
+def _build(name: str, media_root: str, force: bool) -> tuple[str, list[str], str | None]:
+    try:
+        return name, build_derivatives(name, media_root, force), None
+    except Exception as exc:
+        return name, [], str(exc)
+
+
+class Command(BaseCommand):
+    help = "Backfill responsive WebP/JPEG derivatives for existing product images."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+        parser.add_argument("--force", action="store_true",
+                            help="Rebuild derivatives even when they are up to date.")
+        parser.add_argument("--progress-every", type=int, default=500)
+
+    def handle(self, *args, **options):
+        workers: int = options["workers"]
+        force: bool = options["force"]
+        progress_every: int = options["progress_every"]
+        media_root = str(settings.MEDIA_ROOT)
+
+        names = set(
+            Product.objects.exclude(image="").exclude(image__isnull=True)
+            .values_list("image", flat=True)
+        )
+        names.update(ProductImage.objects.values_list("image", flat=True))
+        names = sorted(name for name in names if is_raster(name))
+
+        self.stdout.write(f"Processing {len(names)} images with {workers} workers...")
+
+        started = time.perf_counter()
+        written = failed = done = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_build, name, media_root, force) for name in names]
+            for future in as_completed(futures):
+                name, outputs, error = future.result()
+                done += 1
+                written += len(outputs)
+                if outputs:
+                    forget_derivatives(name)
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+                if progress_every and done % progress_every == 0:
+                    self.stdout.write(f"{done}/{len(names)}...")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} derivatives for {done - failed} images in {elapsed:.2f}s "
+            f"({failed} failed)."
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.availability import reconcile
+
+
+class Command(BaseCommand):
+    help = "Overwrite the cached availability counts with stock - held from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep reconciling every --interval seconds.")
+        parser.add_argument("--interval", type=float, default=300.0)
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                started = time.perf_counter()
+                checked = reconcile(options["batch_size"])
+                elapsed = time.perf_counter() - started
+                self.stdout.write(self.style.SUCCESS(
+                    f"Reconciled availability of {checked} products in {elapsed:.2f}s."
+                ))
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
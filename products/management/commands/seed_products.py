@@ -1,12 +1,18 @@
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from pathlib import Path
 
 from django.conf import settings
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils.text import slugify
 
+from products import search
+from products.page_cache import bump_catalog_generation
 from products.models import Category, Product
 
 
@@ -106,6 +112,49 @@ def _unique_slug(base: str, used_slugs: set[str], max_len: int = 255) -> str:
     return slug
 
 
+def _random_product(rng: random.Random, i: int, category_map: dict, used_slugs: set[str]) -> Product:
+    adjective = rng.choice(ADJECTIVES)
+    pot_type = rng.choice(POT_TYPES)
+    size = rng.choice(SIZES)
+    name = f"{adjective} {pot_type} ({size})"
+
+    description = (
+        f"{rng.choice(DESC_LEADS)} {rng.choice(DESC_MIDDLES)} "
+        f"{rng.choice(DESC_ENDS)}"
+    )
+
+    category_obj = category_map[rng.choice(CATEGORIES)]
+    dollars = rng.randint(8, 120)
+    cents = rng.choice([0, 5, 9, 25, 49, 75, 95])
+    price = Decimal(f"{dollars}.{cents:02d}")
+    stock = rng.randint(5, 120)
+
+    base_slug = slugify(name) or f"product-{i}"
+    slug = _unique_slug(base_slug, used_slugs)
+
+    return Product(
+        name=name,
+        description=description,
+        category=category_obj,
+        price=price,
+        stock=stock,
+        slug=slug,
+    )
+
+
+def _read_image(path: Path, cache: dict[Path, bytes | None]) -> bytes | None:
+    if path not in cache:
+        try:
+            cache[path] = path.read_bytes()
+        except OSError:
+            cache[path] = None
+    return cache[path]
+
+
+def _save_image(name: str, content: bytes) -> str:
+    return default_storage.save(name, ContentFile(content))
+
+
 def _collect_images(images_dir: Path) -> list[Path]:
     if not images_dir.exists() or not images_dir.is_dir():
         return []
@@ -133,12 +182,28 @@ class Command(BaseCommand):
             help="Folder containing images (relative to BASE_DIR or absolute).",
         )
 
+        # 0 keeps the one-save-per-product path (signals fire per row)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=0,
+            help="Insert products with bulk_create in transactions of this many rows.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Threads writing image files in --batch-size mode.",
+        )
+
     def handle(self, *args, **options):
         count: int = options["count"]
         seed: int = options["seed"]
         clear: bool = options["clear"]
         progress_every: int = options["progress_every"]
         images_dir_arg: str = options["images_dir"]
+        batch_size: int = options["batch_size"]
+        workers: int = options["workers"]
 
         if clear:
             Product.objects.all().delete()
@@ -172,56 +237,90 @@ class Command(BaseCommand):
                 f"No images found in: {images_dir_path} (will use SVG placeholders)"
             ))
 
-        created = 0
-        for i in range(count):
-            if progress_every and (i % progress_every == 0):
-                self.stdout.write(f"Seeding {i}/{count}...")
-
-            adjective = rng.choice(ADJECTIVES)
-            pot_type = rng.choice(POT_TYPES)
-            size = rng.choice(SIZES)
-            name = f"{adjective} {pot_type} ({size})"
+        self._image_cache: dict[Path, bytes | None] = {}
 
-            description = (
-                f"{rng.choice(DESC_LEADS)} {rng.choice(DESC_MIDDLES)} "
-                f"{rng.choice(DESC_ENDS)}"
+        started = time.perf_counter()
+        if batch_size > 0:
+            created = self._seed_bulk(
+                count, seed, rng, category_map, used_slugs, image_files,
+                batch_size, workers, progress_every,
             )
+        else:
+            created = self._seed_one_by_one(
+                count, seed, rng, category_map, used_slugs, image_files, progress_every,
+            )
+        elapsed = time.perf_counter() - started
+        # bulk_create skips the signals that mark cached catalog pages stale.
+        bump_catalog_generation()
 
-            category_obj = category_map[rng.choice(CATEGORIES)]
-            dollars = rng.randint(8, 120)
-            cents = rng.choice([0, 5, 9, 25, 49, 75, 95])
-            price = Decimal(f"{dollars}.{cents:02d}")
-            stock = rng.randint(5, 120)
+        rate = created / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} products in {elapsed:.2f}s ({rate:,.0f} rows/s)."
+        ))
 
-            base_slug = slugify(name) or f"product-{i}"
-            slug = _unique_slug(base_slug, used_slugs)
+    def _image_for(self, rng, name: str, seed: int, i: int, image_files: list[Path]) -> tuple[bytes, str]:
+        # Pick a random local image (offline + fast)
+        if image_files:
+            chosen = rng.choice(image_files)
+            image_bytes = _read_image(chosen, self._image_cache)
+            if image_bytes is not None:
+                return image_bytes, chosen.suffix.lower() or ".jpg"
 
-            product = Product(
-                name=name,
-                description=description,
-                category=category_obj,
-                price=price,
-                stock=stock,
-                slug=slug,
-            )
+        return _make_svg_placeholder(name, seed + i), ".svg"
 
-            # Pick a random local image (offline + fast)
-            if image_files:
-                chosen = rng.choice(image_files)
-                try:
-                    image_bytes = chosen.read_bytes()
-                    ext = chosen.suffix.lower() or ".jpg"
-                except OSError:
-                    image_bytes = _make_svg_placeholder(name, seed + i)
-                    ext = ".svg"
-            else:
-                image_bytes = _make_svg_placeholder(name, seed + i)
-                ext = ".svg"
-
-            filename = f"{slug}-{i}{ext}"
+    def _seed_one_by_one(self, count, seed, rng, category_map, used_slugs, image_files, progress_every) -> int:
+        created = 0
+        for i in range(count):
+            if progress_every and (i % progress_every == 0):
+                self.stdout.write(f"Seeding {i}/{count}...")
+
+            product = _random_product(rng, i, category_map, used_slugs)
+            image_bytes, ext = self._image_for(rng, product.name, seed, i, image_files)
+
+            filename = f"{product.slug}-{i}{ext}"
             product.image.save(filename, ContentFile(image_bytes), save=False)
 
             product.save()
             created += 1
 
-        self.stdout.write(self.style.SUCCESS(f"Created {created} products."))
+        return created
+
+    def _seed_bulk(self, count, seed, rng, category_map, used_slugs, image_files,
+                   batch_size, workers, progress_every) -> int:
+        """
+        Build each chunk in memory, write its image files from a thread pool,
+        then insert the whole chunk with one bulk_create per transaction.
+
+        bulk_create skips post_save, so the search index is rebuilt once at
+        the end instead of once per row.
+        """
+        upload_to = Product._meta.get_field("image").upload_to
+        created = 0
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for start in range(0, count, batch_size):
+                stop = min(start + batch_size, count)
+                if progress_every:
+                    self.stdout.write(f"Seeding {start}/{count}...")
+
+                products = []
+                uploads = []
+                for i in range(start, stop):
+                    product = _random_product(rng, i, category_map, used_slugs)
+                    image_bytes, ext = self._image_for(rng, product.name, seed, i, image_files)
+                    name = f"{upload_to}{product.slug}-{i}{ext}"
+                    uploads.append(pool.submit(_save_image, name, image_bytes))
+                    products.append(product)
+
+                for product, upload in zip(products, uploads):
+                    product.image.name = upload.result()
+
+                with transaction.atomic():
+                    Product.objects.bulk_create(products, batch_size=batch_size)
+                created += len(products)
+
+        if search.search_available():
+            self.stdout.write("Rebuilding search index...")
+            search.rebuild_index()
+
+        return created
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_product_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["-created_at", "price", "name"], name="product_admin_order_idx"
+            ),
+        ),
+    ]
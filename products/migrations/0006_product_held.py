@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_product_admin_order_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="held",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
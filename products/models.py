@@ -26,6 +26,10 @@ class Product(models.Model):
 
     stock = models.PositiveSmallIntegerField()
 
+    # Units sitting in carts under an active StockHold (see cart.holds);
+    # kept in step with the hold rows so availability is one row read.
+    held = models.PositiveIntegerField(default=0)
+
     image = models.ImageField(upload_to="Products_Images/", null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -33,6 +37,31 @@ class Product(models.Model):
 
     slug = models.SlugField(unique=True, max_length=255)
 
+    @property
+    def available(self) -> int:
+        # Pages set the live figure from products.availability.
+        if "_available" in self.__dict__:
+            return self.__dict__["_available"]
+        return max(self.stock - self.held, 0)
+
+    @available.setter
+    def available(self, value: int) -> None:
+        self.__dict__["_available"] = value
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="product_listing_idx"),
+            models.Index(
+                fields=["category", "-created_at", "-id"],
+                name="product_cat_listing_idx",
+            ),
+            # ProductAdmin.ordering.
+            models.Index(
+                fields=["-created_at", "price", "name"],
+                name="product_admin_order_idx",
+            ),
+        ]
+
 
 class ProductImage(models.Model):
     product = models.ForeignKey(
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Stand in for the availability-dependent parts while a fragment is rendered
+# for the cache; swapped for the live ones when the fragment is served, so
+# stock changes do not have to evict it.
+STOCK_PLACEHOLDER = "__product_detail_stock__"
+CTA_PLACEHOLDER = "__product_detail_cta__"
+
+_SLUG_KEY = "product_detail:slug:{}"
+_ID_KEY = "product_detail:id:{}"
+_INVALIDATED_KEY = "product_detail:invalidated:{}"
+_GENERATION_KEY = "catalog:generation"
+
+
+def get_detail_fragment(slug: str) -> tuple[int, datetime, str] | None:
+    """(product id, updated_at, html) of the cached product section, if any."""
+    return cache.get(_SLUG_KEY.format(slug))
+
+
+def render_started() -> int:
+    """Timestamp to take before reading the product a fragment is rendered from."""
+    return time.time_ns() // 1000
+
+
+def set_detail_fragment(product, html: str, started: int) -> bool:
+    """
+    Cache the rendered product section under its slug, unless the product
+    was invalidated after `started` (see render_started): the render may
+    have read the old row, and writing it now would serve it until the
+    timeout. Returns whether the fragment was kept.
+
+    A second key maps the product id to the slug so code that only knows
+    ids (stock updates, gallery images, categories) can still find the
+    entry. `updated_at` is kept with the html so the page's validators
+    can be computed without loading the product.
+    """
+    timeout = getattr(settings, "PRODUCT_DETAIL_CACHE_TIMEOUT", 60 * 60)
+    entries = {
+        _SLUG_KEY.format(product.slug): (product.pk, product.updated_at, html),
+        _ID_KEY.format(product.pk): (product.slug, product.updated_at.isoformat()),
+    }
+    if _invalidated_since(product.pk, started):
+        return False
+    cache.set_many(entries, timeout)
+    # An invalidation between the check and the write found nothing to delete.
+    if _invalidated_since(product.pk, started):
+        cache.delete_many(list(entries))
+        return False
+    return True
+
+
+def _invalidated_since(product_id: int, started: int) -> bool:
+    invalidated = cache.get(_INVALIDATED_KEY.format(product_id))
+    return invalidated is not None and invalidated >= started
+
+
+def invalidate_products(product_ids: Iterable[int], slugs: Iterable[str] = (), stamp: bool = True) -> None:
+    """
+    Drop the cached detail sections of these products and move the catalog
+    generation. `stamp` records the invalidation for set_detail_fragment;
+    callers that create rows skip it, so loads leave no key per product.
+    """
+    product_ids = list(product_ids)
+    id_keys = [_ID_KEY.format(pk) for pk in product_ids]
+    keys = set(id_keys)
+    keys.update(_SLUG_KEY.format(slug) for slug in slugs)
+
+    for cached_slug, _ in cache.get_many(id_keys).values():
+        keys.add(_SLUG_KEY.format(cached_slug))
+
+    # Stamp first: a render that is about to write sees it and backs off.
+    if stamp:
+        now = time.time_ns() // 1000
+        cache.set_many(
+            {_INVALIDATED_KEY.format(pk): now for pk in product_ids},
+            getattr(settings, "PRODUCT_DETAIL_CACHE_TIMEOUT", 60 * 60),
+        )
+    if keys:
+        cache.delete_many(list(keys))
+    bump_catalog_generation()
+
+
+def catalog_generation() -> int:
+    """
+    Microsecond timestamp of the last catalog change the database's
+    `updated_at` columns cannot show: deletions, category and gallery
+    edits, bulk seeding. Part of every catalog page's validators;
+    availability is tracked per product instead.
+    """
+    generation = cache.get(_GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns() // 1000
+        # Another process may have started the count meanwhile; use theirs.
+        if not cache.add(_GENERATION_KEY, generation, None):
+            generation = cache.get(_GENERATION_KEY, generation)
+    return generation
+
+
+def bump_catalog_generation() -> None:
+    cache.set(_GENERATION_KEY, time.time_ns() // 1000, None)
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db.models import Q, QuerySet
+
+
+@dataclass(frozen=True)
+class KeysetPage:
+    items: list
+    next_cursor: str | None
+    has_previous: bool
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    raw = f"{created_at.isoformat()}|{pk}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at_str, pk_str = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at_str), int(pk_str)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def keyset_page(queryset: QuerySet, cursor: str | None, page_size: int) -> KeysetPage:
+    """
+    Newest-first page of `queryset` seeking on (created_at, id).
+
+    The cursor is the position of the last row of the previous page, so the
+    database jumps straight to it through the (created_at, id) index instead
+    of counting past OFFSET rows.
+    """
+    position = decode_cursor(cursor)
+    queryset = queryset.order_by("-created_at", "-id")
+
+    if position is not None:
+        created_at, pk = position
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+
+    rows = list(queryset[: page_size + 1])
+    items = rows[:page_size]
+
+    next_cursor = None
+    if len(rows) > page_size:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.pk)
+
+    return KeysetPage(items=items, next_cursor=next_cursor, has_previous=position is not None)
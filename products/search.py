@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Product
+
+SEARCH_TABLE = "products_product_search"
+
+# bm25() column weights, in table column order: name, description, category.
+RANK_WEIGHTS = (10.0, 1.0, 3.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_INDEX_SELECT = f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, name, description, category)
+    SELECT p.id, p.name, p.description, c.name
+    FROM products_product p
+    INNER JOIN products_category c ON c.id = p.category_id
+"""
+
+
+@dataclass(frozen=True)
+class SearchPage:
+    items: list
+    number: int
+    has_next: bool
+
+    @property
+    def has_previous(self) -> bool:
+        return self.number > 1
+
+
+def search_available() -> bool:
+    return connection.vendor == "sqlite"
+
+
+def build_match_query(raw: str) -> str | None:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word is quoted so FTS5 operators typed by the user are matched
+    literally, and the last word gets a prefix match so results show up
+    while the shopper is still typing.
+    """
+    tokens = _TOKEN_RE.findall(raw or "")
+    if not tokens:
+        return None
+
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def index_product(product_id: int) -> None:
+    if not search_available():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [product_id])
+        cursor.execute(_INDEX_SELECT + " WHERE p.id = %s", [product_id])
+
+
+def index_category(category_id: int) -> None:
+    if not search_available():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN "
+            "(SELECT id FROM products_product WHERE category_id = %s)",
+            [category_id],
+        )
+        cursor.execute(_INDEX_SELECT + " WHERE p.category_id = %s", [category_id])
+
+
+def remove_product(product_id: int) -> None:
+    if not search_available():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [product_id])
+
+
+def rebuild_index(chunk_size: int = 5000) -> int:
+    """Repopulate the whole index from the product table, one id range at a time."""
+    if not search_available():
+        return 0
+
+    indexed = 0
+    last_id = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+
+        while True:
+            cursor.execute(
+                "SELECT MAX(id), COUNT(*) FROM ("
+                "SELECT id FROM products_product WHERE id > %s ORDER BY id LIMIT %s)",
+                [last_id, chunk_size],
+            )
+            upper_id, count = cursor.fetchone()
+            if not count:
+                break
+
+            cursor.execute(
+                _INDEX_SELECT + " WHERE p.id > %s AND p.id <= %s",
+                [last_id, upper_id],
+            )
+            indexed += count
+            last_id = upper_id
+
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+
+    return indexed
+
+
+def _ranked_ids(match: str, limit: int, offset: int) -> list[int]:
+    weights = ", ".join(str(w) for w in RANK_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s OFFSET %s",
+            [match, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_ids(raw: str, limit: int, offset: int) -> list[int]:
+    condition = Q()
+    for token in _TOKEN_RE.findall(raw):
+        condition &= (
+            Q(name__icontains=token)
+            | Q(description__icontains=token)
+            | Q(category__name__icontains=token)
+        )
+
+    queryset = Product.objects.filter(condition).order_by("-created_at", "-id")
+    return list(queryset.values_list("id", flat=True)[offset:offset + limit])
+
+
+def search_products(raw: str, *, page: int = 1, page_size: int = 24, fields=None) -> SearchPage:
+    """
+    BM25-ranked page of products matching `raw`.
+
+    Only the ids come out of the index; the page's rows are then loaded
+    with a single `in_bulk` and put back in rank order.
+    """
+    page = max(page, 1)
+    match = build_match_query(raw)
+    if match is None:
+        return SearchPage(items=[], number=page, has_next=False)
+
+    offset = (page - 1) * page_size
+    if search_available():
+        ids = _ranked_ids(match, page_size + 1, offset)
+    else:
+        ids = _fallback_ids(raw, page_size + 1, offset)
+
+    has_next = len(ids) > page_size
+    ids = ids[:page_size]
+
+    queryset = Product.objects.all()
+    if fields:
+        queryset = queryset.only(*fields)
+    by_id = queryset.in_bulk(ids)
+
+    items = [by_id[pk] for pk in ids if pk in by_id]
+    return SearchPage(items=items, number=page, has_next=has_next)
@@ -0,0 +1,80 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import availability, images, page_cache, search
+from .models import Category, Product, ProductImage
+
+SEARCHABLE_PRODUCT_FIELDS = {"name", "description", "category", "category_id"}
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    
+    # Price/stock-only saves (admin list_editable, checkout) don't touch the index.
+    if update_fields is not None and not SEARCHABLE_PRODUCT_FIELDS.intersection(update_fields):
+        return
+    
+    search.index_product(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    search.remove_product(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    
+    search.index_category(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+def build_image_derivatives(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or not instance.image:
+        return
+    
+    if update_fields is not None and "image" not in update_fields:
+        return
+    
+    name = instance.image.name
+    product_id = instance.pk if sender is Product else instance.product_id
+    transaction.on_commit(lambda: images.schedule_derivatives(
+        name, on_done=lambda: page_cache.invalidate_products([product_id])
+    ))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_page(sender, instance, created=False, raw=False, **kwargs):
+    # A new row (or a fixture load) has no render in flight to fence off.
+    page_cache.invalidate_products([instance.pk], slugs=[instance.slug], stamp=not (created or raw))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def forget_product_availability(sender, instance, **kwargs):
+    # Saved stock (admin edits) replaces the cached count rather than adjusting it.
+    product_id = instance.pk
+    transaction.on_commit(lambda: availability.forget([product_id]))
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_gallery_product_page(sender, instance, **kwargs):
+    page_cache.invalidate_products([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_product_pages(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    
+    product_ids = Product.objects.filter(category_id=instance.pk).values_list("id", flat=True)
+    page_cache.invalidate_products(list(product_ids))
@@ -0,0 +1,38 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from products.images import srcset_candidates
+
+register = template.Library()
+
+DEFAULT_SIZES = "(max-width: 480px) 100vw, (max-width: 1200px) 33vw, 300px"
+
+
+def _srcset(candidates):
+    return ", ".join(f"{url} {width}w" for url, width in candidates)
+
+
+@register.simple_tag
+def responsive_img(image, alt="", sizes=DEFAULT_SIZES, **attrs):
+    """
+    Render `image` as a <picture> offering the WebP and JPEG derivatives.
+
+    Falls back to a plain <img> of the original upload when no derivatives
+    exist yet (SVG placeholders, or the pool hasn't caught up).
+    """
+    if not image:
+        return ""
+    
+    extra = format_html_join("", ' {}="{}"', attrs.items())
+    webp = srcset_candidates(image.name, "webp")
+    jpeg = srcset_candidates(image.name, "jpg")
+    
+    if not jpeg:
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', image.url, alt, extra)
+    
+    # No WebP yet (a failed or partial build): an empty srcset is invalid.
+    source = format_html('<source type="image/webp" srcset="{}" sizes="{}">', _srcset(webp), sizes) if webp else ""
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy"{}></picture>',
+        source, jpeg[-1][0], _srcset(jpeg), sizes, alt, extra,
+    )
@@ -1,3 +1,359 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import QueryPlanAssertions, assert_query_budget, create_product, create_products
+from . import availability, images, page_cache, search
+from .models import Product
+from .pagination import encode_cursor, keyset_page
+from .templatetags.product_images import responsive_img
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite's")
+class ProductQueryPlanTests(QueryPlanAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(3)
+        cls.category = cls.products[0].category
+
+    def setUp(self):
+        cache.clear()
+
+    def test_listing(self):
+        with self.assertNoFullScans():
+            response = self.client.get(reverse("products"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_listing_next_page(self):
+        last = self.products[1]
+        with self.assertNoFullScans():
+            self.client.get(reverse("products"), {"after": encode_cursor(last.created_at, last.pk)})
+
+    def test_listing_by_category(self):
+        with self.assertNoFullScans():
+            self.client.get(reverse("products"), {"category": self.category.slug})
+
+    def test_detail(self):
+        with self.assertNoFullScans():
+            response = self.client.get(reverse("product_details", args=[self.products[0].slug]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_ordering(self):
+        self.assertNoFullScan(Product.objects.order_by("-created_at", "price", "name")[:25])
+
+
+@skipUnless(search.search_available(), "The search index is SQLite FTS5")
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.basil = create_product("basil", name="Basil pot", description="Glazed clay")
+
+    def _found(self, query):
+        return search.search_products(query).items
+
+    def test_index_follows_saves_deletes_and_category_renames(self):
+        self.assertEqual(self._found("basil"), [self.basil])
+        self.assertEqual(self._found("bas"), [self.basil])
+
+        self.basil.name = "Mint pot"
+        self.basil.save()
+        self.assertEqual(self._found("basil"), [])
+        self.assertEqual(self._found("mint"), [self.basil])
+
+        category = self.basil.category
+        category.name = "Terracotta"
+        category.save()
+        self.assertEqual(self._found("terracotta"), [self.basil])
+
+        self.basil.delete()
+        self.assertEqual(self._found("mint"), [])
+
+    def test_name_matches_rank_above_description_matches(self):
+        in_description = create_product("plain", name="Plain pot", description="Olive olive olive")
+        in_name = create_product("olive", name="Olive pot", description="Plain")
+        self.assertEqual(self._found("olive"), [in_name, in_description])
+
+    def test_operators_are_matched_literally(self):
+        self.assertEqual(search.build_match_query('NEAR(basil, "pot")'), '"NEAR" "basil" "pot"*')
+        self.assertEqual(search.build_match_query("*^:()"), None)
+        self.assertEqual(self._found('basil* "pot'), [self.basil])
+        self.assertEqual(self._found("NOT basil"), [])
+        self.assertEqual(self._found('"'), [])
+
+    def test_admin_search_uses_the_index(self):
+        create_product("mint", name="Mint pot")
+        model_admin = admin.site._registry[Product]
+        request = RequestFactory().get("/admin/products/product/", {"q": "basil"})
+
+        queryset, may_have_duplicates = model_admin.get_search_results(request, Product.objects.all(), "basil")
+        self.assertEqual(list(queryset), [self.basil])
+        self.assertFalse(may_have_duplicates)
+
+
+class ProductQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(30)
+
+    def setUp(self):
+        cache.clear()
+
+    @assert_query_budget(1)
+    def test_homepage(self):
+        self.client.get(reverse("homepage"))
+
+    @assert_query_budget(1)
+    def test_listing(self):
+        self.client.get(reverse("products"))
+
+    def test_detail_is_served_from_cache(self):
+        url = reverse("product_details", args=[self.products[0].slug])
+        with assert_query_budget(1):
+            self.client.get(url)
+        with assert_query_budget(0):
+            self.client.get(url)
+
+    def test_server_timing_header(self):
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse("products"))
+        self.assertIn('db;dur=', response["Server-Timing"])
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+
+@override_settings(PRODUCTS_PAGE_SIZE=3)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(8)
+        # Two runs of equal created_at, each split across page boundaries.
+        first, second = cls.products[0].created_at, cls.products[5].created_at
+        Product.objects.filter(pk__in=[p.pk for p in cls.products[:5]]).update(created_at=first)
+        Product.objects.filter(pk__in=[p.pk for p in cls.products[5:]]).update(created_at=second)
+
+    def setUp(self):
+        cache.clear()
+
+    def _page(self, after=None):
+        params = {"after": after} if after is not None else {}
+        return self.client.get(reverse("products"), params).context["page"]
+
+    def test_walks_every_product_once_despite_equal_sort_keys(self):
+        expected = list(Product.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+
+        seen, cursor = [], None
+        while True:
+            page = self._page(cursor)
+            seen.extend(product.pk for product in page.items)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(set(seen)), len(self.products))
+
+    def test_malformed_cursor_falls_back_to_the_first_page(self):
+        first = [product.pk for product in self._page().items]
+        # Not base64, no separator, not UTF-8, and a non-numeric id.
+        for after in ("!!!", "Zm9v", "__79", "MjAyNi0wMS0wMXx4"):
+            with self.subTest(after=after):
+                page = self._page(after)
+                self.assertEqual([product.pk for product in page.items], first)
+                self.assertFalse(page.has_previous)
+
+    def test_keyset_page_directly(self):
+        page = keyset_page(Product.objects.all(), "not a cursor", 3)
+        self.assertEqual(len(page.items), 3)
+        self.assertFalse(page.has_previous)
+
+
+class DetailFragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_product()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_render_that_raced_an_invalidation_is_not_cached(self):
+        started = page_cache.render_started()
+        page_cache.invalidate_products([self.product.pk], [self.product.slug])
+        self.assertFalse(page_cache.set_detail_fragment(self.product, "<old>", started))
+        self.assertIsNone(page_cache.get_detail_fragment("dish"))
+
+        started = page_cache.render_started()
+        self.assertTrue(page_cache.set_detail_fragment(self.product, "<new>", started))
+        self.assertEqual(page_cache.get_detail_fragment("dish")[2], "<new>")
+
+    def test_only_existing_products_are_stamped(self):
+        created = create_product("fresh", name="Fresh")
+        self.assertIsNone(cache.get(page_cache._INVALIDATED_KEY.format(created.pk)))
+
+        created.save()
+        self.assertIsNotNone(cache.get(page_cache._INVALIDATED_KEY.format(created.pk)))
+
+    def test_saving_the_product_replaces_the_page(self):
+        url = reverse("product_details", args=["dish"])
+        self.client.get(url)
+
+        self.product.name = "Renamed dish"
+        self.product.save()
+        self.assertContains(self.client.get(url), "Renamed dish")
+
+
+class AvailabilityCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_product()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cart_holds_move_the_cached_count(self):
+        url = reverse("product_details", args=[self.product.slug])
+        self.client.get(url)
+        self.assertEqual(availability.get_many([self.product.pk]), {self.product.pk: 5})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("cart_add", args=[self.product.pk]), {"redirection_page": url})
+        with assert_query_budget(0):
+            self.assertEqual(availability.get(self.product.pk), 4)
+
+        # The cached section is reused with the live count.
+        with assert_query_budget(0):
+            response = self.client.get(url)
+        self.assertContains(response, "4 In stock")
+
+    def test_replica_rows_do_not_seed_the_cache(self):
+        # As if read from a replica that has not caught up yet.
+        stale = Product.objects.get(pk=self.product.pk)
+        stale._state.db = "replica"
+        stale.stock = 99
+
+        availability.attach([stale])
+        self.assertEqual(stale.available, 5)
+        self.assertEqual(availability.get(self.product.pk), 5)
+
+    def test_reconcile_fixes_drift(self):
+        availability.attach([self.product])
+        with self.captureOnCommitCallbacks(execute=True):
+            availability.adjust({self.product.pk: -3})
+        self.assertEqual(availability.get(self.product.pk), 2)
+
+        self.assertEqual(availability.reconcile(), 1)
+        self.assertEqual(availability.get(self.product.pk), 5)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_product()
+
+    def setUp(self):
+        cache.clear()
+
+    def _revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in (reverse("homepage"), reverse("products"), reverse("product_details", args=["dish"])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn("Last-Modified", response)
+                with assert_query_budget(0):
+                    revalidated = self._revalidate(url, response)
+                self.assertEqual(revalidated.status_code, 304)
+                self.assertEqual(revalidated["ETag"], response["ETag"])
+
+    def test_catalog_changes_move_the_validators(self):
+        url = reverse("products")
+        response = self.client.get(url)
+
+        self.product.price = 12
+        self.product.save()
+        self.assertEqual(self._revalidate(url, response).status_code, 200)
+
+        response = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            availability.adjust({self.product.pk: -1})
+        self.assertEqual(self._revalidate(url, response).status_code, 200)
+
+    def test_stock_moves_only_touch_pages_showing_the_product(self):
+        other = create_product("other", name="Other")
+        url = reverse("product_details", args=["dish"])
+        response = self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            availability.adjust({other.pk: -1})
+        self.assertEqual(self._revalidate(url, response).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            availability.adjust({self.product.pk: -1})
+        self.assertEqual(self._revalidate(url, response).status_code, 200)
+
+    def test_pending_messages_are_not_swallowed(self):
+        url = reverse("homepage")
+        response = self.client.get(url)
+
+        redirected = self.client.post(reverse("clear_cart"))
+        self.assertRedirects(redirected, url, fetch_redirect_response=False)
+        revalidated = self._revalidate(url, response)
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertContains(revalidated, "Your cart is already empty.")
+
+    def test_signed_in_variant_does_not_collide(self):
+        url = reverse("products")
+        anonymous = self.client.get(url)
+
+        user = get_user_model().objects.create_user(username="buyer", password="pw")
+        self.client.force_login(user)
+        signed_in = self.client.get(url)
+        self.assertNotEqual(signed_in["ETag"], anonymous["ETag"])
+        self.assertNotIn("Last-Modified", signed_in)
+        self.assertIn("Cookie", signed_in["Vary"])
+        self.assertEqual(self._revalidate(url, anonymous).status_code, 200)
+
+
+class ResponsiveImageTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+        self.image = SimpleNamespace(name="Products_Images/pot.jpg", url="/media/Products_Images/pot.jpg")
+        for width in images.DERIVATIVE_WIDTHS:
+            self._write(images.derivative_name(self.image.name, width, "jpg"))
+
+    def _write(self, name):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+
+    def test_existence_is_looked_up_once(self):
+        html = responsive_img(self.image)
+        self.assertIn("pot-1024w.jpg 1024w", html)
+        self.assertNotIn("image/webp", html)
+
+        with mock.patch.object(images.default_storage, "exists") as exists:
+            self.assertEqual(responsive_img(self.image), html)
+        exists.assert_not_called()
+
+        # Built derivatives replace the cached answer.
+        for width in images.DERIVATIVE_WIDTHS:
+            self._write(images.derivative_name(self.image.name, width, "webp"))
+        images.forget_derivatives(self.image.name)
+        self.assertIn(
+            '<source type="image/webp" srcset="/media/Products_Images/derivatives/pot-320w.webp 320w',
+            responsive_img(self.image),
+        )
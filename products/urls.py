@@ -3,5 +3,6 @@ from . import views
 
 urlpatterns = [
     path('', views.products, name='products'),
+    path('search/', views.search, name='products_search'),
     path('<slug:slug>/', views.product_details, name='product_details'),
 ]
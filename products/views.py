@@ -1,17 +1,91 @@
+from django.conf import settings
 from django.http import Http404
-from django.shortcuts import render
-from .models import Product
+from django.shortcuts import render, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from . import availability
+from .conditional import catalog_page, note_rendered
+from .models import Category, Product
+from .page_cache import (
+    CTA_PLACEHOLDER, STOCK_PLACEHOLDER, get_detail_fragment, render_started, set_detail_fragment,
+)
+from .pagination import keyset_page
+from .search import search_products
 
+# Only the columns products.html renders; created_at/id drive the cursor and
+# updated_at the page's validators.
+LISTING_FIELDS = (
+    'id', 'name', 'slug', 'description', 'price', 'stock', 'held', 'image', 'created_at', 'updated_at',
+)
+
+@catalog_page(lambda request: f"products:{request.GET.get('category', '')}:{request.GET.get('after', '')}")
 def products(request):
-    products = Product.objects.all()
-    return render(request, 'products.html', {'products': products})
+    page_size = getattr(settings, "PRODUCTS_PAGE_SIZE", 24)
+    products = Product.objects.only(*LISTING_FIELDS)
+    
+    category = None
+    category_slug = request.GET.get('category')
+    if category_slug:
+        category = get_object_or_404(Category, slug=category_slug)
+        products = products.filter(category=category)
+    
+    page = keyset_page(products, request.GET.get('after'), page_size)
+    availability.attach(page.items)
+    note_rendered(request, ((product.pk, product.updated_at) for product in page.items))
+    
+    return render(request, 'products.html', {
+        'products': page.items,
+        'page': page,
+        'category': category,
+    })
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_size = getattr(settings, "PRODUCTS_PAGE_SIZE", 24)
+    
+    try:
+        page_number = int(request.GET.get('page', 1))
+    except ValueError:
+        page_number = 1
+    
+    page = search_products(query, page=page_number, page_size=page_size, fields=LISTING_FIELDS)
+    availability.attach(page.items)
+    
+    return render(request, 'search_results.html', {
+        'products': page.items,
+        'page': page,
+        'query': query,
+    })
+
+@catalog_page(lambda request, slug=None: f"detail:{slug}")
 def product_details(request, slug=None):
-    product_detail = None
-    if slug is not None:
-        try:
-            product_detail = Product.objects.get(slug=slug)
-        except:
-            raise Http404
-    
-    return render(request, 'product_details.html', {'product_detail': product_detail})
\ No newline at end of file
+    if slug is None:
+        raise Http404
+    
+    cached = get_detail_fragment(slug)
+    if cached is None:
+        started = render_started()
+        product_detail = get_object_or_404(Product.objects.select_related('category'), slug=slug)
+        availability.attach([product_detail])
+        body = render_to_string('components/product_detail_body.html', {
+            'product_detail': product_detail,
+            'stock_label': STOCK_PLACEHOLDER,
+            'add_to_cart': CTA_PLACEHOLDER,
+        })
+        set_detail_fragment(product_detail, body, started)
+        product_id, updated_at, available = product_detail.pk, product_detail.updated_at, product_detail.available
+    else:
+        product_id, updated_at, body = cached
+        available = availability.get(product_id)
+    note_rendered(request, [(product_id, updated_at)])
+    
+    # The cached section is shared by every visitor and outlives stock
+    # changes; availability and the CSRF token in the form are per request.
+    context = {'available': available, 'product': {'id': product_id, 'slug': slug}}
+    body = body.replace(
+        STOCK_PLACEHOLDER, render_to_string('components/product_detail_stock.html', context).strip()
+    ).replace(
+        CTA_PLACEHOLDER, render_to_string('components/product_detail_cta.html', context, request)
+    )
+    
+    return render(request, 'product_details.html', {'product_body': mark_safe(body)})
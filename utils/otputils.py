@@ -1,21 +1,23 @@
-from kavenegar import KavenegarAPI, APIException, HTTPException
-from django.conf import settings
+import logging
 
-API_KEY = getattr(settings, "API_KEY")
+from accounts.outbox import enqueue_sms
+from core.events import emit
+from utils.sms import SmsDeliveryError, get_backend
+
+
+def otp_message(code):
+    return f"You\'re Confirmation Code: {code}"
 
 def send_Otp_Code(phone_number, code):
+    """Send the code right away, blocking on the provider. Prefer `queue_otp_code`."""
     try:
-        api = KavenegarAPI(API_KEY)
-        params = {
-                'sender' : '2000660110', 
-                'receptor': phone_number,
-                'message' : f"You\'re Confirmation Code: {code}"
-                }
+        get_backend().send(phone_number, otp_message(code))
+        # The provider's reply echoes the message, code included; it is not logged.
+        emit("sms.otp_sent", phone_suffix=phone_number[-4:])
         
-        response = api.sms_send(params)
-        print(response)
-        
-    except APIException as e:
-        print(e)
-    except HTTPException as e:
-        print(e)
+    except SmsDeliveryError as e:
+        emit("sms.otp_failed", logging.WARNING, phone_suffix=phone_number[-4:], error=str(e))
+
+def queue_otp_code(phone_number, code):
+    """Add the code to the SMS outbox; the `send_sms_outbox` worker delivers it."""
+    return enqueue_sms(phone_number, otp_message(code))
@@ -0,0 +1,61 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class SmsDeliveryError(Exception):
+    pass
+
+
+class KavenegarBackend:
+    def __init__(self):
+        from kavenegar import KavenegarAPI
+        
+        self.api = KavenegarAPI(getattr(settings, "API_KEY", ""))
+        self.sender = getattr(settings, "SMS_SENDER", "2000660110")
+    
+    def send(self, receptor, message):
+        from kavenegar import APIException, HTTPException
+        
+        try:
+            return self.api.sms_send({
+                'sender': self.sender,
+                'receptor': receptor,
+                'message': message,
+            })
+        except (APIException, HTTPException) as e:
+            raise SmsDeliveryError(str(e)) from e
+
+
+class FakeBackend:
+    """
+    Offline provider for tests and load tests.
+    
+    Sent messages are appended to `FakeBackend.outbox`. SMS_FAKE_LATENCY_MS
+    and SMS_FAKE_FAILURE_RATE simulate a slow or flaky provider.
+    """
+    outbox = []
+    _lock = threading.Lock()
+    
+    def __init__(self):
+        self.latency = getattr(settings, "SMS_FAKE_LATENCY_MS", 0) / 1000
+        self.failure_rate = getattr(settings, "SMS_FAKE_FAILURE_RATE", 0.0)
+    
+    def send(self, receptor, message):
+        if self.latency:
+            time.sleep(self.latency)
+        
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise SmsDeliveryError("Simulated provider failure.")
+        
+        with self._lock:
+            self.outbox.append({'receptor': receptor, 'message': message})
+        return {'status': 200}
+
+
+def get_backend():
+    backend_path = getattr(settings, "SMS_BACKEND", "utils.sms.KavenegarBackend")
+    return import_string(backend_path)()